@@ -0,0 +1,325 @@
+# analytics/mirror.py
+# Typed DuckDB copy of the transactions table, kept in sync month by month, with monthly totals per
+# category/subcategory. Aggregate /query questions are answered here instead of casting the OLTP table.
+# One-off sync from src/: python -m analytics.mirror   (the API syncs in the background when enabled)
+import logging
+import threading
+import time
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from chat.db_config import get_db_connection
+from chat.schema import SchemaSnapshot, render_schema, schema_version
+from configs.config import (
+    DB_BACKEND,
+    DB_MAX_EXECUTION_TIME_MS,
+    QUERY_STREAM_MAX_EXECUTION_TIME_MS,
+    ANALYTICS_MIRROR_ENABLED,
+    ANALYTICS_MIRROR_PATH,
+    ANALYTICS_SYNC_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+SOURCE_COLUMNS = "transactionId, accountId, categoryId, subcategoryId, date, amount, type, frequency, currency, description"
+
+# Per-month row count and checksum of the source table; a month is re-copied when its entry changes.
+# Months are UTC calendar months of the millisecond `date` column.
+MONTH_FINGERPRINTS = {
+    "mysql": (
+        "SELECT DATE_FORMAT(FROM_UNIXTIME(date DIV 1000), '%Y-%m') AS month, COUNT(*),"
+        f" BIT_XOR(CRC32(CONCAT_WS('|', {SOURCE_COLUMNS})))"
+        " FROM transactions GROUP BY month"
+    ),
+    # No CRC32 in SQLite: catches inserts, deletes and changed amounts or categories, not other edits
+    "sqlite": (
+        "SELECT strftime('%Y-%m', date / 1000, 'unixepoch') AS month, COUNT(*),"
+        " SUM(rowid), TOTAL(CAST(amount AS REAL)), SUM(categoryId * 1000 + subcategoryId)"
+        " FROM transactions GROUP BY month"
+    ),
+}
+
+# Small dimension tables are copied whole on every sync
+DIMENSIONS = {
+    "accounts": ("accountId BIGINT, accountIBAN VARCHAR, accountTyp VARCHAR, accountCategory VARCHAR, "
+                 "balance DECIMAL(14, 2), currency VARCHAR",
+                 "accountId, accountIBAN, accountTyp, accountCategory, balance, currency"),
+    "categories": ("categoryId BIGINT, categoryName VARCHAR, categoryType VARCHAR",
+                   "categoryId, categoryName, categoryType"),
+    "subcategories": ("subCategoryId BIGINT, categoryId BIGINT, subCategoryName VARCHAR, urgency VARCHAR",
+                      "subCategoryId, categoryId, subCategoryName, urgency"),
+}
+
+MIRROR_DDL = [
+    "CREATE TABLE IF NOT EXISTS transactions (transactionId VARCHAR, accountId BIGINT, categoryId BIGINT,"
+    " subcategoryId BIGINT, ts TIMESTAMP, month DATE, amount DECIMAL(14, 2), type VARCHAR, frequency VARCHAR,"
+    " currency VARCHAR, description VARCHAR)",
+    "CREATE TABLE IF NOT EXISTS monthly_totals (month DATE, categoryId BIGINT, subcategoryId BIGINT,"
+    " type VARCHAR, currency VARCHAR, total DECIMAL(18, 2), transactions BIGINT)",
+    "CREATE TABLE IF NOT EXISTS sync_months (month VARCHAR, fingerprint VARCHAR)",
+] + [f"CREATE TABLE IF NOT EXISTS {table} ({columns})" for table, (columns, _) in DIMENSIONS.items()]
+
+MIRROR_TABLES = ["transactions", "monthly_totals", "accounts", "categories", "subcategories"]
+
+MIRROR_NOTES = (
+    "DuckDB. transactions.amount is DECIMAL, ts is TIMESTAMP, month is the first day of its month. "
+    "For totals by month, category or subcategory use monthly_totals (sum of amount and row count)."
+)
+
+
+@contextmanager
+def _deadline(cursor, timeout_ms: int):
+    """Interrupts whatever the cursor is running once timeout_ms have passed, like max_execution_time on MySQL."""
+    timer = threading.Timer(timeout_ms / 1000, cursor.interrupt)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+
+
+def month_bounds_ms(month: str) -> Tuple[int, int]:
+    """'2025-06' -> [start, end) of that UTC month in epoch milliseconds."""
+    year, number = map(int, month.split("-"))
+    start = datetime(year, number, 1, tzinfo=timezone.utc)
+    end = datetime(year + number // 12, number % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+class AnalyticsMirror:
+    """
+    DuckDB file holding typed transactions plus monthly_totals. sync() compares per-month fingerprints of the
+    source table with the ones recorded at the last sync and re-copies only the months that changed, then
+    recomputes their totals, all in one DuckDB transaction; readers keep seeing the previous state meanwhile.
+    """
+
+    def __init__(self, path: str = ANALYTICS_MIRROR_PATH):
+        import duckdb
+        self.path = path
+        # Queries come from the LLM: no reading or writing files other than the mirror itself, no extensions, and
+        # no statement can turn that back on
+        self._conn = duckdb.connect(path, config={"enable_external_access": False, "lock_configuration": True})
+        for statement in MIRROR_DDL:
+            self._conn.execute(statement)
+        self._sync_lock = threading.Lock()
+        self._schema: Optional[SchemaSnapshot] = None
+        self.syncs = 0
+        self.last_sync_at: Optional[float] = None
+        self.last_sync_seconds = 0.0
+        self.last_months_copied = 0
+        self.last_rows_copied = 0
+        self.ready = self._conn.execute("SELECT COUNT(*) FROM sync_months").fetchone()[0] > 0
+
+    def sync(self, chunk_size: int = 5000) -> Dict:
+        """Brings the mirror up to date with the source database and returns what was copied."""
+        with self._sync_lock:
+            start = time.perf_counter()
+            source = get_db_connection()
+            try:
+                source_cursor = source.cursor()
+                if DB_BACKEND == "mysql":
+                    source_cursor.execute("SET time_zone = '+00:00'")
+                source_cursor.execute(MONTH_FINGERPRINTS[DB_BACKEND])
+                fingerprints = {row[0]: repr(row[1:]) for row in source_cursor.fetchall() if row[0]}
+
+                cursor = self._conn.cursor()
+                recorded = dict(cursor.execute("SELECT month, fingerprint FROM sync_months").fetchall())
+                changed = sorted(m for m, fp in fingerprints.items() if recorded.get(m) != fp)
+                removed = sorted(set(recorded) - set(fingerprints))
+                cursor.execute("BEGIN TRANSACTION")
+                try:
+                    rows_copied = 0
+                    for month in changed + removed:
+                        cursor.execute("DELETE FROM transactions WHERE month = CAST(? AS DATE)", [f"{month}-01"])
+                        cursor.execute("DELETE FROM monthly_totals WHERE month = CAST(? AS DATE)", [f"{month}-01"])
+                        cursor.execute("DELETE FROM sync_months WHERE month = ?", [month])
+                    for month in changed:
+                        rows_copied += self._copy_month(source_cursor, cursor, month, chunk_size)
+                        cursor.execute("INSERT INTO sync_months VALUES (?, ?)", [month, fingerprints[month]])
+                    if changed:
+                        cursor.execute(
+                            "INSERT INTO monthly_totals SELECT month, categoryId, subcategoryId, type, currency,"
+                            " SUM(amount), COUNT(*) FROM transactions"
+                            f" WHERE month IN ({', '.join(['CAST(? AS DATE)'] * len(changed))})"
+                            " GROUP BY month, categoryId, subcategoryId, type, currency",
+                            [f"{month}-01" for month in changed]
+                        )
+                    self._copy_dimensions(source_cursor, cursor)
+                    cursor.execute("COMMIT")
+                except BaseException:
+                    cursor.execute("ROLLBACK")
+                    raise
+                finally:
+                    cursor.close()
+                source_cursor.close()
+            finally:
+                source.close()
+
+            self._schema = None
+            self.ready = True
+            self.syncs += 1
+            self.last_sync_at = time.time()
+            self.last_sync_seconds = time.perf_counter() - start
+            self.last_months_copied = len(changed)
+            self.last_rows_copied = rows_copied
+            logger.info(f"Analytics mirror synced: {len(changed)} months ({rows_copied} rows) copied, "
+                        f"{len(removed)} removed in {self.last_sync_seconds:.2f}s")
+            return {"months_copied": len(changed), "months_removed": len(removed), "rows_copied": rows_copied}
+
+    def _copy_month(self, source_cursor, cursor, month: str, chunk_size: int) -> int:
+        start_ms, end_ms = month_bounds_ms(month)
+        # A range on the raw column so MySQL can use an index on `date`
+        source_cursor.execute(
+            f"SELECT {SOURCE_COLUMNS} FROM transactions WHERE date >= {start_ms} AND date < {end_ms}"
+        )
+        cursor.execute(
+            "CREATE OR REPLACE TEMP TABLE staging (transactionId VARCHAR, accountId BIGINT, categoryId BIGINT,"
+            " subcategoryId BIGINT, date BIGINT, amount VARCHAR, type VARCHAR, frequency VARCHAR,"
+            " currency VARCHAR, description VARCHAR)"
+        )
+        copied = 0
+        while rows := source_cursor.fetchmany(chunk_size):
+            cursor.executemany("INSERT INTO staging VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            copied += len(rows)
+        # Typing happens once here instead of in every query; amounts that don't parse become NULL
+        cursor.execute(
+            "INSERT INTO transactions SELECT transactionId, accountId, categoryId, subcategoryId, epoch_ms(date),"
+            " CAST(date_trunc('month', epoch_ms(date)) AS DATE),"
+            " TRY_CAST(REPLACE(TRIM(amount), ',', '.') AS DECIMAL(14, 2)), type, frequency, currency, description"
+            " FROM staging"
+        )
+        return copied
+
+    def _copy_dimensions(self, source_cursor, cursor):
+        for table, (_, columns) in DIMENSIONS.items():
+            try:
+                source_cursor.execute(f"SELECT {columns} FROM {table}")
+                rows = source_cursor.fetchall()
+            except Exception as e:
+                logger.warning(f"Not mirroring {table}: {e}")
+                continue
+            cursor.execute(f"DELETE FROM {table}")
+            if rows:
+                placeholders = ", ".join("?" * len(rows[0]))
+                cursor.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)
+
+    def schema(self) -> SchemaSnapshot:
+        """Prompt schema for the mirror, rebuilt after every sync."""
+        if self._schema is None:
+            cursor = self._conn.cursor()
+            try:
+                tables: Dict[str, List[Dict]] = {}
+                for table, column, column_type, nullable in cursor.execute(
+                    "SELECT table_name, column_name, data_type, is_nullable FROM information_schema.columns"
+                    " WHERE table_schema = 'main' ORDER BY table_name, ordinal_position"
+                ).fetchall():
+                    if table in MIRROR_TABLES:
+                        tables.setdefault(table, []).append({
+                            "name": column, "type": column_type.lower(), "nullable": False, "key": "", "ref": None
+                        })
+                schema = {
+                    "tables": {table: tables[table] for table in MIRROR_TABLES if table in tables},
+                    "categories": [list(r) for r in cursor.execute(
+                        "SELECT categoryId, categoryName, categoryType FROM categories ORDER BY categoryId"
+                    ).fetchall()],
+                    "subcategories": [list(r) for r in cursor.execute(
+                        "SELECT subCategoryId, categoryId, subCategoryName, urgency FROM subcategories"
+                        " ORDER BY categoryId, subCategoryId"
+                    ).fetchall()],
+                }
+            finally:
+                cursor.close()
+            self._schema = SchemaSnapshot(
+                "analytics-" + schema_version(schema), render_schema(schema), "analytics", MIRROR_NOTES
+            )
+        return self._schema
+
+    def execute(self, sql: str, timeout_ms: int = DB_MAX_EXECUTION_TIME_MS) -> List[Dict]:
+        """Runs a query and returns its rows; raises duckdb.InterruptException after timeout_ms."""
+        cursor = self._conn.cursor()
+        try:
+            with _deadline(cursor, timeout_ms):
+                cursor.execute(sql)
+                columns = [desc[0] for desc in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def stream(self, sql: str, chunk_size: int,
+               timeout_ms: int = QUERY_STREAM_MAX_EXECUTION_TIME_MS) -> Iterator[List[Dict]]:
+        """Yields the query's rows in chunks; the whole read, client pauses included, is bounded by timeout_ms."""
+        cursor = self._conn.cursor()
+        try:
+            with _deadline(cursor, timeout_ms):
+                cursor.execute(sql)
+                columns = [desc[0] for desc in cursor.description]
+                while rows := cursor.fetchmany(chunk_size):
+                    yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            cursor.close()
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "syncs": self.syncs,
+            "last_sync_at": self.last_sync_at,
+            "last_sync_seconds": round(self.last_sync_seconds, 3),
+            "last_months_copied": self.last_months_copied,
+            "last_rows_copied": self.last_rows_copied,
+        }
+
+
+_mirror: Optional[AnalyticsMirror] = None
+_mirror_lock = threading.Lock()
+_unavailable = False
+
+
+def get_analytics_mirror() -> Optional[AnalyticsMirror]:
+    """The process-wide mirror, or None when it is disabled or duckdb isn't installed."""
+    global _mirror, _unavailable
+    if not ANALYTICS_MIRROR_ENABLED or _unavailable:
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            try:
+                _mirror = AnalyticsMirror()
+            except ImportError:
+                logger.warning("ANALYTICS_MIRROR_ENABLED is set but duckdb is not installed; using the database")
+                _unavailable = True
+                return None
+        return _mirror
+
+
+def run_sync_loop(stop: threading.Event, interval: float = ANALYTICS_SYNC_INTERVAL_SECONDS):
+    """Syncs the mirror every `interval` seconds until `stop` is set."""
+    while not stop.is_set():
+        mirror = get_analytics_mirror()
+        if mirror is None:
+            return
+        try:
+            mirror.sync()
+        except Exception as e:
+            logger.warning(f"Analytics mirror sync failed: {e}")
+        stop.wait(interval)
+
+
+def main():
+    parser = ArgumentParser(description="Sync the DuckDB analytics mirror from the transactions database.")
+    parser.add_argument("--path", default=ANALYTICS_MIRROR_PATH)
+    parser.add_argument("--loop", action="store_true", help="Keep syncing every ANALYTICS_SYNC_INTERVAL_SECONDS.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mirror = AnalyticsMirror(args.path)
+    while True:
+        print(mirror.sync())
+        if not args.loop:
+            break
+        time.sleep(ANALYTICS_SYNC_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
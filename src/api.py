@@ -1,24 +1,47 @@
 # api.py
 import os
+import json
+import threading
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Union
 from dotenv import load_dotenv
-from tempfile import NamedTemporaryFile
-from pathlib import Path
-from mimetypes import guess_type
-import shutil
-
-from input.image_handler import load_image
-from extraction.easyocr_extractor import extract_text_easyocr
-from speech.whisper_transcriber import transcribe_audio
-from structure.structure_llm import (
-    parse_receipt_with_gemini,
-    parse_receipt_image_with_gemini
+
+from pipeline.receipt import (
+    process_file_cached,
+    process_batch,
+    read_upload,
+    get_result_cache,
+    stream_audio_receipt
+)
+from pipeline.stages import StageBusyError, stages, stage_stats
+from extraction.easyocr_extractor import ocr_script_stats
+from pipeline.query import stream_query
+from categorization.category_cache import get_category_cache
+from categorization.predict_categories import categorization_stats
+from configs.config import (
+    WARMUP_MODELS,
+    BUSY_RETRY_AFTER_SECONDS,
+    MAX_BATCH_FILES,
+    QUERY_PAGE_SIZE,
+    QUERY_MAX_PAGE_SIZE,
+    JOB_MAX_QUEUED
 )
+from models.registry import registry
+from llm.gemini import gemini_stats
+from chat.db_config import get_db_pool
+from chat.query_cache import get_query_cache
+from chat.query_guard import get_query_guard
+from analytics.mirror import get_analytics_mirror, run_sync_loop
+from jobs.queue import get_job_queue
+from observability.metrics import register_stats_collector, render_metrics
+from observability.tracing import add_timing_middleware, span
+from chat.pagination import InvalidPageToken, decode_page_token, encode_page_token, to_columnar
 from chat.chat import (
-    natural_language_to_sql,
+    natural_language_to_sql_async,
     extract_sql,
     execute_safe_query,
     generate_natural_language_response
@@ -32,35 +55,62 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+add_timing_middleware(app)
+
+
+@app.exception_handler(StageBusyError)
+async def stage_busy_handler(request, exc: StageBusyError):
+    """Fail fast when a pipeline stage is saturated instead of piling requests up"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)}
+    )
 
 
 # Pydantic models for NL2SQL
 class NLQueryRequest(BaseModel):
     question: str
+    raw_only: bool = False  # skip answer synthesis and return only the rows
+    page_size: Optional[int] = Field(None, ge=1, le=QUERY_MAX_PAGE_SIZE)
+    page_token: Optional[str] = None  # next_page_token from a previous response; skips SQL generation
+    format: Literal["rows", "columnar"] = "rows"  # columnar: {"columns": [...], "values": [[...] per column]}
 
 
 class NLQueryResponse(BaseModel):
     original_question: str
     generated_sql: str
-    natural_language_response: str
-    raw_results: list = None
+    natural_language_response: Optional[str] = None
+    raw_results: Union[list, dict, None] = None
+    next_page_token: Optional[str] = None
     error: str = None
 
 
-def detect_file_type(file_path: str) -> str:
-    mime, _ = guess_type(file_path)
-    if mime:
-        if mime.startswith("image"):
-            return "image"
-        elif mime.startswith("audio"):
-            return "audio"
-    ext = Path(file_path).suffix.lower()
-    if ext in [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]:
-        return "image"
-    elif ext in [".mp3", ".wav", ".m4a", ".ogg"]:
-        return "audio"
-    return "unknown"
+class WarmupRequest(BaseModel):
+    models: Optional[List[str]] = None
+
+
+@app.on_event("startup")
+async def warmup_configured_models():
+    if WARMUP_MODELS:
+        await run_in_threadpool(registry.warmup, WARMUP_MODELS)
+
+
+_analytics_sync_stop = threading.Event()
+
+
+@app.on_event("startup")
+async def start_analytics_sync():
+    # Keeps the DuckDB mirror behind aggregate /query questions in step with the database
+    if await run_in_threadpool(get_analytics_mirror) is not None:
+        threading.Thread(target=run_sync_loop, args=(_analytics_sync_stop,), daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def stop_analytics_sync():
+    _analytics_sync_stop.set()
 
 
 @app.post("/process")
@@ -72,38 +122,121 @@ async def process_receipt(
     if not api_key:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set.")
 
-    # Save uploaded file to temp path
-    suffix = Path(file.filename).suffix
-    with NamedTemporaryFile(delete=False, suffix=suffix) as temp:
-        shutil.copyfileobj(file.file, temp)
-        temp_path = temp.name
-
-    file_type = detect_file_type(temp_path)
+    # Keep the upload in memory; its type comes from the magic bytes, its hash keys the result cache
+    with span("upload"):
+        upload = await run_in_threadpool(read_upload, await file.read(), file.filename or "")
 
     try:
-        if file_type == "image":
-            if e2e:
-                receipts = parse_receipt_image_with_gemini(temp_path, api_key)
-            else:
-                image = load_image(temp_path)
-                ocr_results = extract_text_easyocr(image)
-                text = "\n".join([t for t, _ in ocr_results])
-                receipts = parse_receipt_with_gemini(text, api_key)
-
-        elif file_type == "audio":
-            text = transcribe_audio(temp_path)
-            receipts = parse_receipt_with_gemini(text, api_key)
-        else:
+        if upload.file_type not in ("image", "audio"):
             raise HTTPException(status_code=400, detail="Unsupported file type.")
 
+        receipts, saved_seconds = await process_file_cached(upload, e2e, api_key)
+
         # Return structured receipt(s) as JSON
-        return JSONResponse([r.model_dump() for r in receipts])
+        cache_stats = await run_in_threadpool(get_result_cache().stats)
+        headers = {
+            "X-Cache": "HIT" if saved_seconds is not None else "MISS",
+            "X-Cache-Hit-Rate": str(cache_stats["hit_rate"]),
+        }
+        if saved_seconds is not None:
+            headers["X-Cache-Saved-Ms"] = str(round(saved_seconds * 1000))
+        return JSONResponse(receipts, headers=headers)
+
+    except (HTTPException, StageBusyError):
+        raise
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {e}")
 
-    finally:
-        os.remove(temp_path)
+
+@app.post("/process/batch")
+async def process_receipts_batch(
+        files: List[UploadFile] = File(...),
+        e2e: bool = Form(False)
+):
+    """
+    Processes many receipt images/audio files in one request. Files are pipelined through OCR/transcription and
+    Gemini concurrently; each gets its own result or error in the response, in upload order.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set.")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} files per batch.")
+
+    with span("upload"):
+        uploads = [await run_in_threadpool(read_upload, await file.read(), file.filename or "") for file in files]
+    results = await process_batch(uploads, e2e, api_key)
+    return JSONResponse([
+        {"filename": file.filename, **result} for file, result in zip(files, results)
+    ])
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+        file: UploadFile = File(...),
+        e2e: bool = Form(False)
+):
+    """
+    Queues a receipt for a `python -m jobs.worker` process instead of holding the connection open while it is
+    processed. Poll GET /jobs/{job_id} for the status and, once done, the same receipts /process returns.
+    """
+    with span("upload"):
+        data = await file.read()
+        upload = await run_in_threadpool(read_upload, data, file.filename or "")
+    if upload.file_type not in ("image", "audio"):
+        raise HTTPException(status_code=400, detail="Unsupported file type.")
+
+    queue = get_job_queue()
+    if await run_in_threadpool(queue.depth) >= JOB_MAX_QUEUED:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "The job queue is full, please retry later."},
+            headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)}
+        )
+    job_id = await run_in_threadpool(queue.submit, data, file.filename or "", e2e)
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a submitted job: queued (with its queue_position), running, done (with result) or failed (with error)"""
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return job
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/process/stream")
+async def process_receipt_stream(file: UploadFile = File(...)):
+    """
+    Server-sent events variant of /process for audio receipts: `segment` events carry the transcript as it is
+    decoded, followed by `transcript`, `receipts` and finally `done` (or `error`).
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set.")
+
+    with span("upload"):
+        upload = await run_in_threadpool(read_upload, await file.read(), file.filename or "")
+    if upload.file_type != "audio":
+        raise HTTPException(status_code=400, detail="Streaming is only supported for audio files.")
+    if stages["asr"].saturated:
+        raise StageBusyError("asr")
+
+    async def events():
+        try:
+            async for event, data in stream_audio_receipt(upload, api_key):
+                yield _sse(event, data)
+            yield _sse("done", {})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Processing error: {e}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.post("/query", response_model=NLQueryResponse)
@@ -113,16 +246,25 @@ async def query_database(request: NLQueryRequest):
     Converts natural language to SQL, executes it safely, and returns a natural language response.
     """
     try:
-        # Generate SQL from natural language
-        sql = natural_language_to_sql(request.question)
-        cleaned_sql = extract_sql(sql)
+        if request.page_token:
+            try:
+                cleaned_sql, offset, dialect = decode_page_token(request.page_token)
+            except (InvalidPageToken, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid page token.")
+        else:
+            # Generate SQL from natural language
+            sql, dialect = await stages["llm"].run_async(natural_language_to_sql_async, request.question)
+            cleaned_sql, offset = extract_sql(sql), 0
 
         if not cleaned_sql:
             raise HTTPException(status_code=400, detail="Unable to generate valid SQL from the question.")
 
         # Execute the query safely
         try:
-            results, nl_response = execute_safe_query(cleaned_sql, request.question)
+            results, nl_response, next_offset = await stages["db"].run(
+                execute_safe_query, cleaned_sql, request.question, request.raw_only,
+                request.page_size or QUERY_PAGE_SIZE, offset, dialect
+            )
 
             if results is None:
                 return NLQueryResponse(
@@ -136,28 +278,103 @@ async def query_database(request: NLQueryRequest):
                 original_question=request.question,
                 generated_sql=cleaned_sql,
                 natural_language_response=nl_response,
-                raw_results=results
+                raw_results=to_columnar(results) if request.format == "columnar" else results,
+                next_page_token=encode_page_token(cleaned_sql, next_offset, dialect) if next_offset is not None else None
             )
 
         except ValueError as ve:
-            # This handles the "Only read-only queries are allowed" error
+            # Rejected by the query guard: not a single read-only statement, or over the plan budgets
+            if getattr(ve, "reason", None) == "too_expensive":
+                message = "That question would read too much data at once. Please narrow it down, for example to a date range or a category."
+            else:
+                message = "I can only execute read-only queries for security reasons. Please ask questions that don't require data modification."
             return NLQueryResponse(
                 original_question=request.question,
                 generated_sql=cleaned_sql,
-                natural_language_response="I can only execute read-only queries for security reasons. Please ask questions that don't require data modification.",
+                natural_language_response=message,
                 error=str(ve)
             )
 
+    except (HTTPException, StageBusyError):
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query processing error: {str(e)}")
 
 
+@app.post("/query/stream")
+async def query_database_stream(request: NLQueryRequest):
+    """
+    Server-sent events variant of /query: a `sql` event with the generated query, `rows` events with chunks of
+    rows as the cursor reads them, then `summary` with the row count and answer, and finally `done` (or `error`).
+    """
+    for stage in ("llm", "db"):
+        if stages[stage].saturated:
+            raise StageBusyError(stage)
+
+    async def events():
+        try:
+            async for event, data in stream_query(request.question, request.raw_only):
+                yield _sse(event, data)
+            yield _sse("done", {})
+        except ValueError as ve:
+            yield _sse("error", {"detail": str(ve)})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Query processing error: {e}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "Receipt Processor API with NL2SQL"}
 
 
+# Shared by /stats and the gauges on /metrics
+STATS_SOURCES = {
+    "category_cache": lambda: get_category_cache().stats(),
+    "categorization": categorization_stats,
+    "result_cache": lambda: get_result_cache().stats(),
+    "models": registry.stats,
+    "ocr_scripts": ocr_script_stats,
+    "gemini": gemini_stats,
+    "stages": stage_stats,
+    "db_pool": lambda: get_db_pool().stats(),
+    "query_cache": lambda: get_query_cache().stats(),
+    "query_guard": lambda: get_query_guard().stats(),
+    "jobs": lambda: get_job_queue().stats(),
+    "analytics_mirror": lambda: mirror.stats() if (mirror := get_analytics_mirror()) is not None else None,
+}
+register_stats_collector(STATS_SOURCES)
+
+
+@app.get("/stats")
+async def stats():
+    """Cache statistics for monitoring"""
+    # The readers query SQLite caches, the job queue, the mirror and the pool lock; keep them off the event loop
+    return await run_in_threadpool(lambda: {name: read() for name, read in STATS_SOURCES.items()})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: stage/request latency histograms plus the /stats counters as gauges"""
+    body, content_type = await run_in_threadpool(render_metrics)
+    return Response(body, media_type=content_type)
+
+
+@app.post("/warmup")
+async def warmup(request: WarmupRequest = None):
+    """Loads the requested models (by default the ones the configured pipeline uses) ahead of traffic"""
+    names = request.models if request else None
+    try:
+        return await run_in_threadpool(registry.warmup, names)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ImportError as e:
+        raise HTTPException(status_code=400, detail=f"Model dependencies are not installed: {e}")
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,117 @@
+# benchmarks/categorization.py
+# Compares the per-item classification loop against the batched, deduplicated classify_receipts, then runs the
+# rules-first cascade and reports how many items each tier resolved and how accurately. The keyword rules are also
+# scored alone on the held-out fixture, whose items were not used to write them (--rules-only skips the model).
+# Run from src/: python -m benchmarks.categorization --receipts 20 --items-per-receipt 40
+import json
+import os
+import random
+import time
+from argparse import ArgumentParser
+
+from categorization.predict_categories import classify_receipts, categorization_stats, CANDIDATE_LABELS
+from categorization.category_cache import get_category_cache
+from categorization.rules import match_item
+from models.registry import registry
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "labeled_items.json")
+HELDOUT_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "heldout_items.json")
+
+
+def build_receipts(num_receipts: int, items_per_receipt: int, seed: int = 0):
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        names = [entry["name"] for entry in json.load(f)]
+
+    rng = random.Random(seed)
+    return [
+        {"items": [{"name": rng.choice(names)} for _ in range(items_per_receipt)]}
+        for _ in range(num_receipts)
+    ]
+
+
+def classify_per_item(receipts):
+    """The original loop: one classifier call per item, no deduplication."""
+    classifier = registry.get("categorizer:zero-shot").classifier
+    for receipt in receipts:
+        for item in receipt.get("items", []):
+            result = classifier(item["name"], CANDIDATE_LABELS)
+            item["category"] = result["labels"][0]
+            item["classification_score"] = round(result["scores"][0], 3)
+    return receipts
+
+
+def rule_accuracy(path: str):
+    """How many of a labeled fixture's items the keyword rules claim, and how many of those they get right."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    matched = [(entry, match_item(entry["name"])) for entry in entries]
+    matched = [(entry, category) for entry, category in matched if category]
+    wrong = [(entry, category) for entry, category in matched if category != entry["category"]]
+    print(f"rules on {os.path.basename(path):<20} {len(matched):>3}/{len(entries)} items matched, "
+          f"{len(matched) - len(wrong)}/{len(matched)} correct")
+    for entry, category in wrong:
+        print(f"  {entry['name']!r}: {category}, expected {entry['category']}")
+
+
+def run(label, fn, receipts):
+    num_items = sum(len(r["items"]) for r in receipts)
+    start = time.perf_counter()
+    fn(receipts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {num_items:>6} items  {elapsed:>8.2f}s  {num_items / elapsed:>8.1f} items/sec")
+    return receipts
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark per-item vs batched item categorization.")
+    parser.add_argument("--receipts", type=int, default=10)
+    parser.add_argument("--items-per-receipt", type=int, default=40)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--rules-only", action="store_true", help="Only score the keyword rules; no model needed.")
+    args = parser.parse_args()
+
+    rule_accuracy(FIXTURE_PATH)
+    rule_accuracy(HELDOUT_PATH)
+    if args.rules_only:
+        return
+
+    # Warm up the pipeline so the first measurement doesn't include model loading
+    registry.get("categorizer:zero-shot").classify(["warmup"])
+
+    baseline = run("per-item loop", classify_per_item, build_receipts(args.receipts, args.items_per_receipt))
+    for batch_size in args.batch_sizes:
+        batched = run(
+            f"classify_receipts(bs={batch_size})",
+            lambda receipts: classify_receipts(receipts, batch_size=batch_size, use_cache=False, backend="zero-shot",
+                                               tiers=()),
+            build_receipts(args.receipts, args.items_per_receipt)
+        )
+        mismatches = sum(
+            a["category"] != b["category"]
+            for ra, rb in zip(baseline, batched)
+            for a, b in zip(ra["items"], rb["items"])
+        )
+        if mismatches:
+            print(f"  ⚠️ {mismatches} items categorized differently from the per-item loop")
+
+    # Repeat items are served from the category cache once it has seen them
+    cache = get_category_cache()
+    classify_receipts(build_receipts(args.receipts, args.items_per_receipt), backend="zero-shot", tiers=())
+    run("classify_receipts(warm cache)", lambda receipts: classify_receipts(receipts, backend="zero-shot", tiers=()),
+        build_receipts(args.receipts, args.items_per_receipt))
+    print(f"category cache: {cache.stats()}")
+
+    # The full cascade: rules resolve most fixture items, the model only sees the rest
+    receipts = run("classify_receipts(cascade)", lambda receipts: classify_receipts(receipts, use_cache=False),
+                   build_receipts(args.receipts, args.items_per_receipt))
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        expected = {entry["name"]: entry["category"] for entry in json.load(f)}
+    for source in ("rules", "model"):
+        items = [item for receipt in receipts for item in receipt["items"] if item["category_source"] == source]
+        correct = sum(item["category"] == expected[item["name"]] for item in items)
+        print(f"  {source:<6} {len(items):>5} items, {correct / len(items) if items else 0:.1%} correct")
+    print(f"cascade tiers: {categorization_stats()}")
+
+
+if __name__ == "__main__":
+    main()
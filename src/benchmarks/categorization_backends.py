@@ -0,0 +1,89 @@
+# benchmarks/categorization_backends.py
+# Accuracy vs throughput of the categorization backends on benchmarks/fixtures/labeled_items.json: accuracy against
+# the fixture labels, agreement with bart-large-mnli ("zero-shot"), items/sec and per-batch latency, plus each
+# backend's load time and memory. Backends whose dependencies are missing are reported as skipped.
+# Run from src/: python -m benchmarks.categorization_backends [--backends distilled embedding] [--output report.json]
+import json
+import os
+import time
+from argparse import ArgumentParser
+
+from benchmarks.stats import summarize
+from categorization.backends import BACKENDS, BACKEND_MODELS
+from categorization.predict_categories import predict_categories
+from models.registry import registry
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "labeled_items.json")
+REFERENCE = "zero-shot"
+
+
+def evaluate(backend: str, names, batch_size: int, repeat: int):
+    """(predicted labels, latency summary over batches) for one backend, cache bypassed."""
+    registry.get(f"categorizer:{backend}").classify(names[:1])  # untimed, so loading isn't counted
+    latencies, predictions = [], {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for offset in range(0, len(names), batch_size):
+            batch = names[offset:offset + batch_size]
+            batch_start = time.perf_counter()
+            predictions.update(predict_categories(batch, batch_size, use_cache=False, backend=backend))
+            latencies.append(time.perf_counter() - batch_start)
+    wall = time.perf_counter() - start
+    summary = summarize(latencies, wall)
+    summary["items_per_sec"] = round(len(names) * repeat / wall, 1)
+    return [predictions[name][0] for name in names], summary
+
+
+def main():
+    parser = ArgumentParser(description="Compare categorization backends for accuracy and throughput.")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the report as JSON.")
+    args = parser.parse_args()
+
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        fixture = json.load(f)
+    names = [entry["name"] for entry in fixture]
+    expected = [entry["category"] for entry in fixture]
+
+    backends = sorted(args.backends, key=lambda backend: backend != REFERENCE)  # the reference runs first
+    report, reference = {}, None
+    print(f"{len(names)} labeled items, batch size {args.batch_size}, {args.repeat} passes\n")
+    print(f"{'backend':<10} {'accuracy':>8} {'vs bart':>8} {'items/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'load s':>7} {'mem MB':>7}  model")
+    for backend in backends:
+        try:
+            labels, summary = evaluate(backend, names, args.batch_size, args.repeat)
+        except ImportError as e:
+            report[backend] = {"skipped": f"missing dependency: {e.name}"}
+            print(f"{backend:<10} skipped ({e})")
+            continue
+
+        if backend == REFERENCE:
+            reference = labels
+        load = registry.stats()[f"categorizer:{backend}"]
+        report[backend] = {
+            "model": BACKEND_MODELS[backend],
+            "accuracy": round(sum(a == b for a, b in zip(labels, expected)) / len(names), 3),
+            "agreement_with_reference": (
+                round(sum(a == b for a, b in zip(labels, reference)) / len(names), 3) if reference else None
+            ),
+            "load_time_sec": load.get("load_time_sec"),
+            "memory_mb": load.get("memory_mb"),
+            **summary,
+        }
+        row = report[backend]
+        agreement = f"{row['agreement_with_reference']:.3f}" if reference else "-"
+        print(f"{backend:<10} {row['accuracy']:>8.3f} {agreement:>8} {row['items_per_sec']:>9.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['load_time_sec']:>7.2f} {row['memory_mb']:>7.1f}"
+              f"  {row['model']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# benchmarks/gemini_throughput.py
+# Structuring throughput through the shared async Gemini client. Defaults to the offline stub backend:
+# GEMINI_STUB_LATENCY_MS=800 python -m benchmarks.gemini_throughput --calls 64 --concurrency 1 8 32
+import asyncio
+import os
+import time
+from argparse import ArgumentParser
+
+os.environ.setdefault("GEMINI_BACKEND", "stub")
+
+from llm.gemini import GeminiClient
+from structure.structure_llm import RECEIPT_CONFIG, _text_prompt
+
+SAMPLE_TEXT = "SUPERMARKET\nMILK 1L 1.29\nBREAD 2.10\nTOTAL 3.39"
+
+
+async def run(calls: int, concurrency: int) -> float:
+    client = GeminiClient(os.getenv("GEMINI_API_KEY", ""), max_concurrency=concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client.generate(_text_prompt(f"{SAMPLE_TEXT}\n#{i}"), config=RECEIPT_CONFIG) for i in range(calls)
+    ))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark Gemini structuring throughput at different concurrency caps.")
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"backend={os.environ['GEMINI_BACKEND']}")
+    for concurrency in args.concurrency:
+        elapsed = asyncio.run(run(args.calls, concurrency))
+        print(f"concurrency={concurrency:<4} {args.calls} calls in {elapsed:.2f}s -> {args.calls / elapsed:.1f} calls/sec")
+
+
+if __name__ == "__main__":
+    main()
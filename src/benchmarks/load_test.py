@@ -0,0 +1,93 @@
+# benchmarks/load_test.py
+# Saturates /process with concurrent uploads and checks that /health latency stays flat meanwhile.
+# Start the API first (python api.py), then from src/:
+#   python -m benchmarks.load_test --url http://localhost:8003 --concurrency 16 --duration 30
+import os
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.stats import percentile
+
+DEFAULT_SAMPLE = os.path.join(os.path.dirname(__file__), "..", "sample_data", "Images", "English", "1.jpg")
+
+
+def probe_health(url, stop, interval, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        requests.get(f"{url}/health", timeout=30)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+
+
+def hammer_process(url, sample_path, stop, statuses):
+    with open(sample_path, "rb") as f:
+        payload = f.read()
+    filename = os.path.basename(sample_path)
+
+    while not stop.is_set():
+        try:
+            response = requests.post(
+                f"{url}/process",
+                files={"file": (filename, payload)},
+                data={"e2e": "false"},
+                timeout=300
+            )
+            statuses[response.status_code] += 1
+        except requests.RequestException:
+            statuses["error"] += 1
+
+
+def measure_health(url, seconds, interval):
+    latencies, stop = [], threading.Event()
+    prober = threading.Thread(target=probe_health, args=(url, stop, interval, latencies))
+    prober.start()
+    time.sleep(seconds)
+    stop.set()
+    prober.join()
+    return latencies
+
+
+def describe(label, latencies):
+    print(f"{label:<22} n={len(latencies):<5} p50={percentile(latencies, 50) * 1000:>7.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:>7.1f}ms max={max(latencies, default=0) * 1000:>7.1f}ms")
+
+
+def main():
+    parser = ArgumentParser(description="Check that /health stays responsive while /process is saturated.")
+    parser.add_argument("--url", default="http://localhost:8003")
+    parser.add_argument("--sample", default=DEFAULT_SAMPLE, help="Receipt file to upload repeatedly.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent /process clients.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load.")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between /health probes.")
+    parser.add_argument("--max-p95-ratio", type=float, default=5.0,
+                        help="Fail if /health p95 under load exceeds this multiple of the idle p95 (plus 20ms).")
+    args = parser.parse_args()
+
+    idle = measure_health(args.url, 5, args.interval)
+    describe("/health idle", idle)
+
+    stop, statuses = threading.Event(), Counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(hammer_process, args.url, args.sample, stop, statuses)
+        loaded = measure_health(args.url, args.duration, args.interval)
+        stop.set()
+
+    describe("/health under load", loaded)
+    print(f"/process responses: {dict(statuses)}")
+
+    budget = percentile(idle, 95) * args.max_p95_ratio + 0.02
+    if percentile(loaded, 95) > budget:
+        print(f"❌ /health p95 under load exceeded {budget * 1000:.1f}ms")
+        sys.exit(1)
+    print("✅ /health latency stayed flat under load")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/ocr_scripts.py
+# Per-language OCR throughput over sample_data/Images/<Language>/ with script detection routing each image to its
+# reader, plus how often detection picked the expected script and the memory each loaded reader took.
+# Run from src/: python -m benchmarks.ocr_scripts [--repeat 3] [--script latin]
+import glob
+import os
+import time
+from argparse import ArgumentParser
+
+from benchmarks.stats import summarize
+from configs.config import OCR_SCRIPTS
+from input.image_handler import load_image
+from input.preprocess import preprocess_image
+from extraction.easyocr_extractor import PRIMARY_SCRIPT, detect_script, extract_text_easyocr, ocr_script_stats
+from models.registry import registry
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data", "Images")
+# Sample folder -> the script its receipts should be routed to; unlisted folders are expected to be Latin
+EXPECTED_SCRIPTS = {"Arabic": "arabic", "Chinese": "chinese"}
+
+
+def detected_script(image) -> str:
+    from easyocr.utils import reformat_input
+    image, grey = reformat_input(image)
+    horizontal_list, free_list = registry.get(f"easyocr:{PRIMARY_SCRIPT}").detect(image, reformat=False)
+    return detect_script(grey, horizontal_list[0], free_list[0])
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark script-routed OCR per sample language.")
+    parser.add_argument("--images-dir", default=IMAGES_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--script", choices=list(OCR_SCRIPTS), help="Force one reader instead of detecting.")
+    args = parser.parse_args()
+
+    languages = sorted(d for d in os.listdir(args.images_dir) if os.path.isdir(os.path.join(args.images_dir, d)))
+    registry.get(f"easyocr:{PRIMARY_SCRIPT}")
+    print("scripts: " + ", ".join(f"{script}={'+'.join(langs)}" for script, langs in OCR_SCRIPTS.items()) + "\n")
+    print(f"{'language':<10} {'images':>6} {'routed to':<16} {'correct':>7} {'p50 ms':>9} {'p95 ms':>9} {'img/s':>7}")
+
+    for language in languages:
+        paths = sorted(glob.glob(os.path.join(args.images_dir, language, "*")))
+        images = [preprocess_image(load_image(path)) for path in paths]
+        if not images:
+            continue
+        expected = EXPECTED_SCRIPTS.get(language, "latin")
+        routed = [args.script or detected_script(image) for image in images]
+        # The untimed routing pass loads every reader this language needs, so load time isn't counted as latency;
+        # timed runs include detection unless a script is forced
+
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for image in images:
+                image_start = time.perf_counter()
+                extract_text_easyocr(image, script=args.script)
+                latencies.append(time.perf_counter() - image_start)
+        summary = summarize(latencies, time.perf_counter() - start)
+
+        counts = {script: routed.count(script) for script in dict.fromkeys(routed)}
+        print(f"{language:<10} {len(images):>6} {', '.join(f'{s}x{n}' for s, n in counts.items()):<16} "
+              f"{routed.count(expected):>3}/{len(routed):<3} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} "
+              f"{summary['throughput_per_sec']:>7.2f}")
+
+    print("\nreaders:")
+    for name, stats in registry.stats().items():
+        if name.startswith("easyocr:"):
+            loaded = f"{stats['load_time_sec']:.2f}s, +{stats['memory_mb']} MB" if stats["loaded"] else "not loaded"
+            print(f"  {name:<18} {loaded}")
+    print(f"routed images: {ocr_script_stats()}")
+
+
+if __name__ == "__main__":
+    main()
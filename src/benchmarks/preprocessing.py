@@ -0,0 +1,72 @@
+# benchmarks/preprocessing.py
+# OCR time and text quality over sample_data/Images with and without the preprocessing stage.
+# Run from src/: python -m benchmarks.preprocessing [--crop]
+import difflib
+import glob
+import os
+import time
+from argparse import ArgumentParser
+
+from input.image_handler import load_image
+from input.preprocess import preprocess_image
+from extraction.easyocr_extractor import PRIMARY_SCRIPT, extract_text_easyocr
+from models.registry import registry
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data", "Images")
+
+
+def ocr(image):
+    start = time.perf_counter()
+    results = extract_text_easyocr(image)
+    elapsed = time.perf_counter() - start
+    text = "\n".join(t for t, _ in results)
+    confidence = sum(c for _, c in results) / len(results) if results else 0.0
+    return elapsed, text, confidence
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark OCR with and without image preprocessing.")
+    parser.add_argument("--images-dir", default=IMAGES_DIR)
+    parser.add_argument("--max-long-edge", type=int, default=1600)
+    parser.add_argument("--no-grayscale", action="store_true")
+    parser.add_argument("--no-autocontrast", action="store_true")
+    parser.add_argument("--crop", action="store_true", help="Enable receipt-region cropping.")
+    args = parser.parse_args()
+
+    registry.get(f"easyocr:{PRIMARY_SCRIPT}")
+    paths = sorted(glob.glob(os.path.join(args.images_dir, "*", "*")))
+
+    print(f"{'image':<24} {'pixels':>10} {'raw s':>7} {'prep s':>7} {'raw conf':>8} {'prep conf':>9} {'similarity':>10}")
+    totals = {"raw": 0.0, "prep": 0.0, "preprocess": 0.0}
+    for path in paths:
+        image = load_image(path)
+        image.load()
+        raw_time, raw_text, raw_conf = ocr(image)
+
+        start = time.perf_counter()
+        prepared = preprocess_image(
+            image,
+            max_long_edge=args.max_long_edge,
+            grayscale=not args.no_grayscale,
+            autocontrast=not args.no_autocontrast,
+            crop_receipt=args.crop
+        )
+        preprocess_time = time.perf_counter() - start
+        prep_time, prep_text, prep_conf = ocr(prepared)
+
+        # Without ground truth, agreement with the unprocessed OCR output is the quality proxy
+        similarity = difflib.SequenceMatcher(None, raw_text, prep_text).ratio()
+        totals["raw"] += raw_time
+        totals["prep"] += prep_time
+        totals["preprocess"] += preprocess_time
+
+        name = os.path.relpath(path, args.images_dir)
+        print(f"{name:<24} {image.width * image.height:>10} {raw_time:>7.2f} {prep_time + preprocess_time:>7.2f} "
+              f"{raw_conf:>8.3f} {prep_conf:>9.3f} {similarity:>10.3f}")
+
+    print(f"\nTotal OCR time: raw {totals['raw']:.2f}s, preprocessed {totals['prep']:.2f}s "
+          f"(+{totals['preprocess']:.2f}s preprocessing) over {len(paths)} images")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# benchmarks/stages.py
+# Offline per-stage latency benchmark over sample_data/Images and sample_data/Audio: decode (+preprocessing),
+# OCR, transcription, structuring and categorization are timed separately at each concurrency level.
+# Gemini runs on the stub backend; to benchmark against real answers, record them once and replay them:
+#   GEMINI_BACKEND=record GEMINI_STUB_RESPONSES_PATH=benchmarks/fixtures/gemini_responses.json python -m benchmarks.stages
+#   GEMINI_STUB_RESPONSES_PATH=benchmarks/fixtures/gemini_responses.json GEMINI_STUB_LATENCY_MS=800 python -m benchmarks.stages
+# Compare against a saved baseline (exits 1 on a p95 regression):
+#   python -m benchmarks.stages --concurrency 1 4 --save-baseline benchmarks/baselines/stages.json
+#   python -m benchmarks.stages --concurrency 1 4 --baseline benchmarks/baselines/stages.json --max-regression 0.25
+import io
+import json
+import os
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+os.environ.setdefault("GEMINI_BACKEND", "stub")
+
+from benchmarks.stats import summarize
+from configs.config import GEMINI_BACKEND
+from models.registry import registry
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data")
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "labeled_items.json")
+STAGES = ["decode", "ocr", "transcription", "structuring", "categorization"]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".ogg", ".flac")
+# Structuring input when OCR/transcription didn't run, so the Gemini stage can be measured on its own
+SAMPLE_TEXT = "SUPERMARKET\nMILK 1L 1.29\nBREAD 2.10\nAPPLES 1KG 2.49\nTOTAL 5.88"
+
+
+def load_samples(root: str = SAMPLE_DIR):
+    """Returns ([(name, bytes)] images, [(name, bytes)] audio) in a stable order."""
+    images, audio = [], []
+    for dirpath, _, filenames in sorted(os.walk(root)):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root)
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((name, open(path, "rb").read()))
+            elif filename.lower().endswith(AUDIO_EXTENSIONS):
+                audio.append((name, open(path, "rb").read()))
+    return images, audio
+
+
+def decode(data: bytes):
+    from input.image_handler import load_image_from_bytes
+    from input.preprocess import preprocess_image
+    return preprocess_image(load_image_from_bytes(data))
+
+
+def ocr(image) -> str:
+    from extraction.easyocr_extractor import extract_text_easyocr
+    return "\n".join(t for t, _ in extract_text_easyocr(image))
+
+
+def transcribe(data: bytes) -> str:
+    from speech.whisper_transcriber import transcribe_audio
+    return transcribe_audio(io.BytesIO(data))
+
+
+def structure(text: str):
+    from structure.structure_llm import parse_receipt_with_gemini
+    return [r.model_dump() for r in parse_receipt_with_gemini(text, os.getenv("GEMINI_API_KEY", ""))]
+
+
+def categorize(receipt: dict):
+    from categorization.predict_categories import classify_receipts
+    # The cache would turn every repeat into a lookup and the cheap tiers would skip it; this measures the model
+    return classify_receipts([receipt], use_cache=False, tiers=())
+
+
+def fixture_receipts(count: int, items_per_receipt: int = 20):
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        names = [entry["name"] for entry in json.load(f)]
+    return [
+        {"items": [{"name": names[(i * items_per_receipt + j) % len(names)]} for j in range(items_per_receipt)]}
+        for i in range(count)
+    ]
+
+
+def measure(fn, inputs, concurrency: int, repeat: int):
+    """Runs fn over every input `repeat` times with `concurrency` workers; returns (summary, outputs of run 1)."""
+    def timed(item):
+        start = time.perf_counter()
+        output = fn(item)
+        return time.perf_counter() - start, output
+
+    latencies, outputs = [], []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for run in range(repeat):
+            for latency, output in pool.map(timed, inputs):
+                latencies.append(latency)
+                if run == 0:
+                    outputs.append(output)
+    return summarize(latencies, time.perf_counter() - start), outputs
+
+
+def run_suite(stages, concurrency_levels, repeat: int, images, audio):
+    """Times each stage in pipeline order, feeding a stage's first-run outputs to the next one."""
+    results = {}
+    decoded, texts, receipts = None, [], []
+
+    plan = [
+        ("decode", decode, lambda: [data for _, data in images]),
+        ("ocr", ocr, lambda: decoded if decoded is not None else [decode(data) for _, data in images]),
+        ("transcription", transcribe, lambda: [data for _, data in audio]),
+        ("structuring", structure, lambda: texts or [SAMPLE_TEXT] * max(1, len(images) + len(audio))),
+        ("categorization", categorize,
+         lambda: [r for r in receipts if r.get("items")] or fixture_receipts(max(1, len(images) + len(audio)))),
+    ]
+    for name, fn, inputs_for in plan:
+        if name not in stages:
+            continue
+        try:
+            inputs = inputs_for()
+            if not inputs:
+                results[name] = {"skipped": "no samples"}
+                continue
+            # Untimed first call, so model loading isn't counted as stage latency
+            fn(inputs[0])
+        except ImportError as e:
+            results[name] = {"skipped": f"missing dependency: {e.name}"}
+            print(f"{name:<15} skipped ({e})")
+            continue
+
+        results[name] = {}
+        for concurrency in concurrency_levels:
+            summary, outputs = measure(fn, inputs, concurrency, repeat)
+            results[name][str(concurrency)] = summary
+            print(f"{name:<15} c={concurrency:<3} n={summary['n']:<4} p50={summary['p50_ms']:>9.1f}ms "
+                  f"p95={summary['p95_ms']:>9.1f}ms p99={summary['p99_ms']:>9.1f}ms "
+                  f"{summary['throughput_per_sec']:>8.2f}/s")
+
+        if name == "decode":
+            decoded = outputs
+        elif name in ("ocr", "transcription"):
+            texts.extend(outputs)
+        elif name == "structuring":
+            receipts = [receipt for output in outputs for receipt in output]
+    return results
+
+
+def compare(current: dict, baseline: dict, max_regression: float):
+    """Stage/concurrency pairs whose p95 grew by more than max_regression (a fraction) over the baseline."""
+    regressions = []
+    for stage, levels in current["stages"].items():
+        for concurrency, summary in levels.items():
+            before = baseline.get("stages", {}).get(stage, {}).get(concurrency)
+            if not isinstance(summary, dict) or not isinstance(before, dict) or "p95_ms" not in before:
+                continue
+            limit = before["p95_ms"] * (1 + max_regression)
+            if summary["p95_ms"] > limit:
+                regressions.append(f"{stage} c={concurrency}: p95 {summary['p95_ms']:.1f}ms > "
+                                   f"{limit:.1f}ms (baseline {before['p95_ms']:.1f}ms)")
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description="Offline per-stage latency benchmark over sample_data.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the samples per concurrency level.")
+    parser.add_argument("--samples", default=SAMPLE_DIR, help="Directory with Images/ and Audio/ subfolders.")
+    parser.add_argument("--output", help="Write this run's results as JSON.")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against.")
+    parser.add_argument("--save-baseline", help="Write this run's results as the new baseline.")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 growth over the baseline, as a fraction.")
+    args = parser.parse_args()
+
+    images, audio = load_samples(args.samples)
+    print(f"gemini backend={GEMINI_BACKEND}  images={len(images)}  audio={len(audio)}  repeat={args.repeat}")
+    current = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "gemini_backend": GEMINI_BACKEND,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "images": len(images),
+            "audio": len(audio),
+            "repeat": args.repeat,
+        },
+        "stages": run_suite(args.stages, args.concurrency, args.repeat, images, audio),
+    }
+    current["meta"]["models"] = registry.stats()
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"📝 Results saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No stage regressed more than {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
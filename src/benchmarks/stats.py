@@ -0,0 +1,23 @@
+# benchmarks/stats.py
+# Latency summaries shared by the benchmark scripts.
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], wall_seconds: float) -> Dict:
+    """n, p50/p95/p99/max in milliseconds and calls per second over the wall-clock time of the run."""
+    return {
+        "n": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+        "throughput_per_sec": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+    }
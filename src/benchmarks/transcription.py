@@ -0,0 +1,61 @@
+# benchmarks/transcription.py
+# Real-time factor (processing seconds per second of audio, lower is faster) of Whisper over sample_data/Audio:
+# the sequential transcribe() path against the batched pipeline at several batch sizes. Decoding is timed
+# separately, since every file is decoded and resampled once before any transcription runs.
+# Run from src/: python -m benchmarks.transcription [--batch-sizes 1 4 8 16] [--model-size small] [--cpu-threads 4]
+import os
+import time
+from argparse import ArgumentParser
+
+from speech.whisper_transcriber import SAMPLING_RATE, decode, load_model, transcribe_audio, transcribe_batched
+from configs.config import WHISPER_MODEL_SIZE, WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS
+
+AUDIO_DIR = os.path.join(os.path.dirname(__file__), "..", "sample_data", "Audio")
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark sequential vs batched Whisper transcription.")
+    parser.add_argument("--audio-dir", default=AUDIO_DIR)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--model-size", default=WHISPER_MODEL_SIZE)
+    parser.add_argument("--cpu-threads", type=int, default=WHISPER_CPU_THREADS)
+    parser.add_argument("--num-workers", type=int, default=WHISPER_NUM_WORKERS)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    from faster_whisper import BatchedInferencePipeline
+    from models.registry import registry
+
+    start = time.perf_counter()
+    model = load_model(args.model_size, args.cpu_threads, args.num_workers)
+    print(f"model {args.model_size} loaded in {time.perf_counter() - start:.1f}s "
+          f"(cpu_threads={args.cpu_threads or 'auto'}, num_workers={args.num_workers})")
+    # transcribe_audio() goes through the registry; hand it the model configured here
+    registry.register("whisper", lambda: model)
+    pipeline = BatchedInferencePipeline(model=model)
+
+    paths = sorted(os.path.join(args.audio_dir, f) for f in os.listdir(args.audio_dir))
+    start = time.perf_counter()
+    audio = [decode(path) for path in paths]
+    decode_seconds = time.perf_counter() - start
+    audio_seconds = sum(len(samples) for samples in audio) / SAMPLING_RATE * args.repeat
+    print(f"{len(paths)} files, {audio_seconds / args.repeat:.1f}s of audio, decoded in {decode_seconds:.2f}s "
+          f"(RTF {decode_seconds / (audio_seconds / args.repeat):.4f})\n")
+
+    transcribe_audio(audio[0])  # untimed warmup
+    runs = [("sequential", transcribe_audio)]
+    runs += [(f"batched bs={size}", lambda samples, size=size: transcribe_batched(samples, size, pipeline))
+             for size in args.batch_sizes]
+
+    print(f"{'mode':<16} {'wall s':>8} {'RTF':>8} {'x realtime':>10}")
+    for label, fn in runs:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for samples in audio:
+                fn(samples)
+        wall = time.perf_counter() - start
+        print(f"{label:<16} {wall:>8.2f} {wall / audio_seconds:>8.4f} {audio_seconds / wall:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import datetime
+import decimal
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+def _json_default(value: Any) -> Any:
+    # Database rows carry Decimal and date/time values; store them the way the API would serialize them
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+class SQLiteTTLCache:
+    """
+    Bounded key/value store with per-entry TTL, kept in a SQLite file (or ":memory:").
+    Values are stored as JSON together with the time it took to compute them, so a hit can report
+    how much latency it saved. When more than max_entries are stored, the oldest entries are evicted.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, table: str = "entries"):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, cost REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created ON {table} (created)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Returns (value, cost_seconds) for a live entry, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, cost FROM {self.table} WHERE key = ? AND created > ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1]
+            return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, cost_seconds: float = 0.0):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, cost) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=_json_default), now, cost_seconds)
+            )
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created <= ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "entries": entries,
+            }
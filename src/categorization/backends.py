@@ -0,0 +1,123 @@
+import logging
+import os
+from typing import List, Tuple
+
+from configs.config import (
+    CATEGORIZATION_MODEL,
+    CATEGORIZATION_DISTILLED_MODEL,
+    CATEGORIZATION_ONNX_MODEL,
+    CATEGORIZATION_ONNX_PATH,
+    CATEGORIZATION_EMBEDDING_MODEL,
+    CATEGORIZATION_MODEL_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ZeroShotBackend:
+    """NLI zero-shot classification: each name is scored against every label as an entailment hypothesis."""
+
+    def __init__(self, labels: List[str], model: str = CATEGORIZATION_MODEL):
+        from transformers import pipeline
+        self.labels = labels
+        self.classifier = pipeline("zero-shot-classification", model=model)
+
+    def classify(self, names: List[str]) -> List[Tuple[str, float]]:
+        results = self.classifier(names, self.labels, batch_size=CATEGORIZATION_MODEL_BATCH_SIZE)
+        if isinstance(results, dict):
+            results = [results]
+        return [(result["labels"][0], round(result["scores"][0], 3)) for result in results]
+
+
+class DistilledBackend(ZeroShotBackend):
+    """Zero-shot classification with a distilled NLI model: a fraction of bart-large-mnli's layers."""
+
+    def __init__(self, labels: List[str], model: str = CATEGORIZATION_DISTILLED_MODEL):
+        super().__init__(labels, model)
+
+
+class OnnxBackend(ZeroShotBackend):
+    """
+    Zero-shot classification on ONNX Runtime with dynamically int8-quantized weights. The export and
+    quantization run once, on the first load, and are reused from CATEGORIZATION_ONNX_PATH afterwards.
+    """
+
+    QUANTIZED_FILE = "model_quantized.onnx"
+
+    def __init__(self, labels: List[str], model: str = CATEGORIZATION_ONNX_MODEL, path: str = CATEGORIZATION_ONNX_PATH):
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer, pipeline
+
+        if not os.path.exists(os.path.join(path, self.QUANTIZED_FILE)):
+            self.export(model, path)
+        self.labels = labels
+        self.classifier = pipeline(
+            "zero-shot-classification",
+            model=ORTModelForSequenceClassification.from_pretrained(path, file_name=self.QUANTIZED_FILE),
+            tokenizer=AutoTokenizer.from_pretrained(path)
+        )
+
+    @classmethod
+    def export(cls, model: str, path: str):
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        logger.info(f"Exporting {model} to ONNX with int8 weights under {path}")
+        onnx_model = ORTModelForSequenceClassification.from_pretrained(model, export=True)
+        onnx_model.save_pretrained(path)
+        AutoTokenizer.from_pretrained(model).save_pretrained(path)
+        # Dynamic quantization: int8 weights, activations quantized per batch, no calibration data needed
+        ORTQuantizer.from_pretrained(onnx_model).quantize(
+            save_dir=path, quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        )
+
+
+class EmbeddingBackend:
+    """
+    Nearest label by cosine similarity of mean-pooled sentence embeddings. Label embeddings are computed once at
+    load, so a name costs one short encoder pass instead of one NLI pass per label.
+    """
+
+    TEMPERATURE = 0.05  # turns cosine similarities into a softmax score comparable to the NLI backends'
+
+    def __init__(self, labels: List[str], model: str = CATEGORIZATION_EMBEDDING_MODEL):
+        from transformers import AutoModel, AutoTokenizer
+        self.labels = labels
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModel.from_pretrained(model).eval()
+        self.label_embeddings = self.embed([f"a purchase in the category {label}" for label in labels])
+
+    def embed(self, texts: List[str]):
+        import torch
+        embeddings = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), CATEGORIZATION_MODEL_BATCH_SIZE):
+                batch = self.tokenizer(texts[start:start + CATEGORIZATION_MODEL_BATCH_SIZE], padding=True,
+                                       truncation=True, max_length=64, return_tensors="pt")
+                hidden = self.model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                embeddings.append(torch.nn.functional.normalize(pooled, dim=-1))
+        return torch.cat(embeddings)
+
+    def classify(self, names: List[str]) -> List[Tuple[str, float]]:
+        probabilities = (self.embed(names) @ self.label_embeddings.T / self.TEMPERATURE).softmax(dim=-1)
+        scores, indices = probabilities.max(dim=-1)
+        return [(self.labels[i], round(float(s), 3)) for s, i in zip(scores.tolist(), indices.tolist())]
+
+
+BACKENDS = {
+    "zero-shot": ZeroShotBackend,
+    "distilled": DistilledBackend,
+    "onnx": OnnxBackend,
+    "embedding": EmbeddingBackend,
+}
+
+# The model behind each backend; part of the category cache version so backends never share cached answers
+BACKEND_MODELS = {
+    "zero-shot": CATEGORIZATION_MODEL,
+    "distilled": CATEGORIZATION_DISTILLED_MODEL,
+    "onnx": f"{CATEGORIZATION_ONNX_MODEL}@onnx-int8",
+    "embedding": CATEGORIZATION_EMBEDDING_MODEL,
+}
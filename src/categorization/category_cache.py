@@ -0,0 +1,112 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from configs.config import CATEGORY_CACHE_PATH, CATEGORY_CACHE_SIZE
+
+
+def normalize_item_name(name: str) -> str:
+    """Lower-cases and collapses punctuation/whitespace so 'MILK  1L' and 'milk 1l.' share a cache entry."""
+    name = re.sub(r"[^\w%.]+", " ", name.lower())
+    return re.sub(r"\s+", " ", name).strip(" .")
+
+
+def label_set_version(labels: Iterable[str], model: str = "") -> str:
+    """Short hash of the label set (and model) so entries become stale when either changes."""
+    digest = hashlib.sha1("\n".join([model, *labels]).encode("utf-8")).hexdigest()
+    return digest[:12]
+
+
+class CategoryCache:
+    """In-memory LRU in front of a SQLite table mapping normalized item names to (category, score)."""
+
+    def __init__(self, path: str = CATEGORY_CACHE_PATH, max_size: int = CATEGORY_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False) if path else None
+        if self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS item_categories ("
+                " name TEXT NOT NULL, version TEXT NOT NULL, category TEXT NOT NULL, score REAL NOT NULL,"
+                " PRIMARY KEY (name, version))"
+            )
+            self._conn.commit()
+
+    def get_many(self, names: List[str], version: str) -> Dict[str, Tuple[str, float]]:
+        """Returns cached predictions for the given normalized names; misses are simply absent."""
+        found = {}
+        with self._lock:
+            missing = []
+            for name in dict.fromkeys(names):
+                key = (name, version)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[name] = self._memory[key]
+                else:
+                    missing.append(name)
+
+            if missing and self._conn:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT name, category, score FROM item_categories"
+                        f" WHERE version = ? AND name IN ({','.join('?' * len(chunk))})",
+                        [version, *chunk]
+                    ).fetchall()
+                    for name, category, score in rows:
+                        found[name] = (category, score)
+                        self._remember((name, version), (category, score))
+
+            self.hits += len(found)
+            self.misses += len(set(names)) - len(found)
+        return found
+
+    def put_many(self, predictions: Dict[str, Tuple[str, float]], version: str):
+        with self._lock:
+            for name, value in predictions.items():
+                self._remember((name, version), value)
+            if self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO item_categories (name, version, category, score) VALUES (?, ?, ?, ?)",
+                    [(name, version, category, score) for name, (category, score) in predictions.items()]
+                )
+                self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn:
+                self._conn.execute("DELETE FROM item_categories")
+                self._conn.commit()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+
+_cache: Optional[CategoryCache] = None
+
+
+def get_category_cache() -> CategoryCache:
+    global _cache
+    if _cache is None:
+        _cache = CategoryCache()
+    return _cache
@@ -1,8 +1,13 @@
-from transformers import pipeline
-import time
-from typing import List, Dict
-
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+import functools
+import threading
+from collections import Counter
+from typing import Iterable, List, Dict, Tuple
+from configs.config import CATEGORIZATION_BACKEND, CATEGORIZATION_BATCH_SIZE, CATEGORIZATION_TIERS
+from categorization.backends import BACKENDS, BACKEND_MODELS
+from categorization.rules import match_item, match_vendor
+from categorization.category_cache import get_category_cache, normalize_item_name, label_set_version
+from models.registry import registry
+from observability.tracing import span
 
 CANDIDATE_LABELS = [
     "Food & Dining", "Groceries", "Transportation", "Fuel", "Lodging", "Travel",
@@ -11,13 +16,105 @@ CANDIDATE_LABELS = [
     "Education", "Subscriptions", "Telecom", "Insurance", "Taxes & Fees",
     "Gifts & Donations", "Household", "Childcare", "Pet Care", "Miscellaneous"
 ]
+_LABELS = set(CANDIDATE_LABELS)
+
+# Items resolved by each cascade tier: "llm", "rules", then "cache" and "model" inside predict_categories
+_tier_counts = Counter()
+_tier_lock = threading.Lock()
+
+# Every backend stays loadable by name (the benchmarks compare them); only the configured one is warmed up
+for _name, _backend in BACKENDS.items():
+    registry.register(f"categorizer:{_name}", functools.partial(_backend, CANDIDATE_LABELS),
+                      warmup=_name == CATEGORIZATION_BACKEND)
+
+
+def cache_version(backend: str = CATEGORIZATION_BACKEND) -> str:
+    """Category cache version for a backend: changes with the label set and the backend's model."""
+    return label_set_version(CANDIDATE_LABELS, BACKEND_MODELS[backend])
+
+
+def predict_categories(names: List[str], batch_size: int = CATEGORIZATION_BATCH_SIZE, use_cache: bool = True,
+                       backend: str = CATEGORIZATION_BACKEND) -> Dict[str, Tuple[str, float]]:
+    """
+    Returns name -> (label, score). Names are looked up in the category cache by their normalized form;
+    only the remaining distinct names run through the backend's classifier, in batches.
+    """
+    version = cache_version(backend)
+    keys = {name: normalize_item_name(name) for name in names}
+    cache = get_category_cache() if use_cache else None
+    cached = cache.get_many(list(keys.values()), version) if cache else {}
+
+    # One representative spelling per normalized name goes to the model
+    pending = {}
+    for name, key in keys.items():
+        if key not in cached:
+            pending.setdefault(key, name)
+
+    computed = {}
+    pending_keys = list(pending)
+    classifier = registry.get(f"categorizer:{backend}") if pending_keys else None
+    for start in range(0, len(pending_keys), batch_size):
+        batch = pending_keys[start:start + batch_size]
+        with span("categorization"):
+            results = classifier.classify([pending[key] for key in batch])
+        computed.update(zip(batch, results))
+
+    if cache and computed:
+        cache.put_many(computed, version)
+
+    with _tier_lock:
+        for name in names:
+            _tier_counts["cache" if keys[name] in cached else "model"] += 1
+
+    predictions = {**cached, **computed}
+    return {name: predictions[key] for name, key in keys.items()}
+
+
+def classify_receipts(receipts: List[Dict], batch_size: int = CATEGORIZATION_BATCH_SIZE, use_cache: bool = True,
+                      backend: str = CATEGORIZATION_BACKEND,
+                      tiers: Iterable[str] = CATEGORIZATION_TIERS) -> List[Dict]:
+    """
+    Classifies the items of many receipts at once and adds 'category', 'classification_score' and
+    'category_source' fields. Items go through the cascade in order: a valid category the LLM already returned
+    ("llm"), the keyword rules for the item name and then the vendor ("rules"), and only the rest reach
+    predict_categories ("model", served from the category cache where possible). Cheap tiers leave the score
+    as None.
+    """
+    tiers = set(tiers)
+    unresolved = []
+    resolved = Counter()
+    for receipt in receipts:
+        vendor_category = match_vendor(receipt.get("vendor")) if "rules" in tiers else None
+        for item in receipt.get("items", []):
+            if "llm" in tiers and item.get("category") in _LABELS:
+                source, category = "llm", item["category"]
+            elif "rules" in tiers and (category := match_item(item["name"]) or vendor_category):
+                source = "rules"
+            else:
+                unresolved.append(item)
+                continue
+            item["category"], item["classification_score"], item["category_source"] = category, None, source
+            resolved[source] += 1
+
+    with _tier_lock:
+        _tier_counts.update(resolved)
+
+    predictions = predict_categories([item["name"] for item in unresolved], batch_size, use_cache, backend)
+    # Cache hits hold the backend's earlier answers, so they are "model" here; the tier counts tell them apart
+    for item in unresolved:
+        item["category"], item["classification_score"] = predictions[item["name"]]
+        item["category_source"] = "model"
+    return receipts
+
 
 def classify_items(receipt: Dict) -> Dict:
     """Classifies each item in a receipt and adds 'category' field."""
-    for item in receipt.get("items", []):
-        sequence = item["name"]
-        result = classifier(sequence, CANDIDATE_LABELS)
+    return classify_receipts([receipt])[0]
+
 
-        item["category"] = result["labels"][0]
-        item["classification_score"] = round(result["scores"][0], 3)
-    return receipt
\ No newline at end of file
+def categorization_stats() -> Dict:
+    """Items resolved per cascade tier in this process, and the share that needed the model."""
+    with _tier_lock:
+        counts = {tier: _tier_counts[tier] for tier in ("llm", "rules", "cache", "model")}
+    total = sum(counts.values())
+    return {**counts, "model_rate": round(counts["model"] / total, 4) if total else 0.0}
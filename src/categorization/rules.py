@@ -0,0 +1,109 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from configs.config import CATEGORY_RULES_PATH
+from categorization.category_cache import normalize_item_name
+
+# Item keywords per category, matched as whole words against the normalized item name (a trailing "s"/"es" is
+# allowed). Categories are tried in this order and the first match wins, so the specific ones come first:
+# "DOG FOOD" is Pet Care, "TRAVEL INSURANCE" Insurance and "RESORT FEE" Lodging rather than Taxes & Fees.
+# A rule overrides the model, so a keyword belongs here only if it means its category in nearly every item name;
+# words that also name food or other things ("dog", "baby", "course", "nail", "tip", "mouse") only count as part
+# of a phrase. Check changes against benchmarks/fixtures/heldout_items.json, not only the tuning fixture.
+ITEM_KEYWORDS: Dict[str, List[str]] = {
+    "Insurance": ["insurance", "insurer", "assurance", "versicherung", "seguro", "premium payment"],
+    "Pet Care": ["dog food", "dog treat", "dog toy", "dog lead", "cat food", "cat treat", "cat litter", "pet food",
+                 "pet shampoo", "vet", "veterinary", "kibble", "flea", "hundefutter"],
+    "Childcare": ["diaper", "nappy", "nappies", "baby food", "baby wipe", "baby formula", "baby shampoo",
+                  "daycare", "babysitter", "formula milk", "infant formula"],
+    "Pharmacy": ["ibuprofen", "paracetamol", "acetaminophen", "aspirin", "cough syrup", "antibiotic", "vitamin",
+                 "pharmacy", "prescription", "bandage", "blister plaster"],
+    "Healthcare": ["doctor", "dental", "dentist", "clinic", "consultation", "physiotherapy", "hospital",
+                   "blood test", "checkup", "optician"],
+    "Fuel": ["unleaded", "diesel", "gasoline", "petrol", "fuel", "super e10", "gazole", "benzin", "gasolina"],
+    "Transportation": ["uber", "lyft", "taxi", "cab fare", "bus", "metro", "subway", "tram", "parking", "toll",
+                       "train ticket"],
+    "Travel": ["flight", "airfare", "airline", "baggage", "luggage", "boarding pass", "visa fee"],
+    "Lodging": ["hotel", "motel", "resort", "hostel", "airbnb", "room night"],
+    "Subscriptions": ["netflix", "spotify", "subscription", "disney plus", "hulu", "icloud", "youtube premium"],
+    "Telecom": ["sim", "data plan", "mobile plan", "prepaid", "airtime", "phone bill", "broadband"],
+    "Utilities": ["electricity", "water bill", "gas bill", "power bill", "utility bill", "heating"],
+    "Entertainment": ["movie", "cinema", "concert", "bowling", "theater", "theatre", "museum", "amusement park"],
+    "Education": ["textbook", "online course", "language course", "course fee", "course material", "tuition",
+                  "school fee", "exam fee"],
+    "Gifts & Donations": ["gift", "donation", "charity"],
+    "Services": ["haircut", "barber", "salon", "dry cleaning", "car wash", "repair", "tailoring", "locksmith"],
+    "Household": ["dish soap", "detergent", "toilet paper", "trash bag", "bin bag", "paper towel", "bleach",
+                  "kitchen sponge", "scrub sponge", "fabric softener"],
+    "Office Supplies": ["paper ream", "a4", "stapler", "staple", "ballpoint", "pen", "notebook", "printer ink",
+                        "envelope", "highlighter"],
+    "Hardware & Tools": ["hammer", "screwdriver", "drill", "drill bit", "wrench", "pliers", "box of nails",
+                         "wood screw", "utility knife"],
+    "Electronics": ["usb", "usb c", "cable", "hdmi", "computer mouse", "wireless mouse", "keyboard", "charger",
+                    "adapter", "headphone", "earbud", "battery", "batteries"],
+    "Clothing": ["t shirt", "shirt", "jeans", "shoe", "sneaker", "jacket", "sock", "dress", "trousers"],
+    "Food & Dining": ["burger", "cheeseburger", "pizza", "latte", "espresso", "cappuccino", "sushi", "hot dog",
+                      "fries", "sandwich", "kebab", "shawarma", "falafel", "croissant", "gratuity"],
+    "Groceries": ["milk", "bread", "banana", "egg", "cheese", "juice", "chicken", "rice", "olive oil", "tomato",
+                  "butter", "flour", "sugar", "yogurt", "pasta", "lait", "fromage", "oeufs", "leche", "queso",
+                  "huevos", "milch", "brot", "käse", "eier"],
+    "Taxes & Fees": ["vat", "tax", "service charge", "fee", "surcharge", "mwst", "tva", "iva"],
+}
+
+# Vendors whose receipts are almost always a single category, matched against the receipt's vendor. They apply
+# only to items no item keyword matched.
+VENDOR_KEYWORDS: Dict[str, List[str]] = {
+    "Fuel": ["shell", "bp", "esso", "exxon", "chevron", "aral", "texaco", "adnoc", "enoc"],
+    "Pharmacy": ["pharmacy", "apotheke", "pharmacie", "farmacia", "cvs", "walgreens", "boots"],
+    "Lodging": ["hotel", "marriott", "hilton", "hyatt", "ibis", "novotel"],
+    "Transportation": ["uber", "lyft", "careem", "taxi"],
+    "Travel": ["airlines", "airways", "emirates", "ryanair", "easyjet", "lufthansa"],
+    "Subscriptions": ["netflix", "spotify"],
+}
+
+
+def _compile(table: Dict[str, List[str]]) -> List[Tuple[re.Pattern, str]]:
+    return [
+        (re.compile(r"\b(?:" + "|".join(re.escape(normalize_item_name(k)) for k in keywords) + r")(?:e?s)?\b"),
+         category)
+        for category, keywords in table.items() if keywords
+    ]
+
+
+def _load_tables() -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """The built-in tables, extended by CATEGORY_RULES_PATH ({"items": {category: [keywords]}, "vendors": {...}})."""
+    items = {category: list(keywords) for category, keywords in ITEM_KEYWORDS.items()}
+    vendors = {category: list(keywords) for category, keywords in VENDOR_KEYWORDS.items()}
+    if CATEGORY_RULES_PATH:
+        with open(CATEGORY_RULES_PATH, encoding="utf-8") as f:
+            extra = json.load(f)
+        # Extra keywords are tried before the built-in ones of every category
+        for table, additions in ((items, extra.get("items", {})), (vendors, extra.get("vendors", {}))):
+            merged = {category: list(keywords) for category, keywords in additions.items()}
+            for category, keywords in table.items():
+                merged.setdefault(category, []).extend(keywords)
+            table.clear()
+            table.update(merged)
+    return items, vendors
+
+
+_item_rules, _vendor_rules = (_compile(table) for table in _load_tables())
+
+
+def _match(rules: List[Tuple[re.Pattern, str]], text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    normalized = normalize_item_name(text)
+    for pattern, category in rules:
+        if pattern.search(normalized):
+            return category
+    return None
+
+
+def match_item(name: str) -> Optional[str]:
+    return _match(_item_rules, name)
+
+
+def match_vendor(vendor: Optional[str]) -> Optional[str]:
+    return _match(_vendor_rules, vendor)
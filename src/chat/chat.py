@@ -1,15 +1,38 @@
+import asyncio
 import os
 import logging
 from dotenv import load_dotenv
-from src.chat.db_config import get_db_connection
-from src.chat.query_guard import is_read_only
-from google import genai
+from chat.db_config import get_db_pool, set_execution_time, streaming_cursor
+from chat.query_guard import get_query_guard
+from chat.query_cache import get_query_cache
+from chat.schema import SchemaSnapshot, get_schema
+from analytics.mirror import MIRROR_TABLES, AnalyticsMirror, get_analytics_mirror
+from chat.synthesis import ResultSummary, summarize_results, template_response
+from chat.pagination import paginate
+from configs.config import (
+    DB_BACKEND,
+    DB_MAX_EXECUTION_TIME_MS,
+    QUERY_PAGE_SIZE,
+    QUERY_MAX_PAGE_SIZE,
+    QUERY_STREAM_CHUNK_ROWS,
+    QUERY_STREAM_MAX_ROWS,
+    QUERY_STREAM_MAX_EXECUTION_TIME_MS
+)
+from llm.gemini import get_gemini_client
+from observability.tracing import span
 import re
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
 load_dotenv()
 logging.basicConfig(filename="query.log", level=logging.INFO)
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+# Questions answered from the analytics mirror's typed tables and monthly totals when it is enabled
+AGGREGATE_QUESTION = re.compile(
+    r"\b(total|sum|average|avg|how much|spent|spend|spending|earned|income|per (month|category|subcategory)|"
+    r"monthly|by (month|category|subcategory)|breakdown|trend|most|least|biggest|top \d+)\b",
+    re.IGNORECASE
+)
 
 
 def extract_sql(text: str) -> str:
@@ -35,163 +58,227 @@ def extract_sql(text: str) -> str:
     return text
 
 
-def get_table_schema():
-    """Return the table schema information as a string"""
-    return """
-🔹 Table: accounts
-  - accountId (bigint(20)) NOT NULL
-  - accountIBAN (varchar(34)) NOT NULL
-  - accountTyp (varchar(50)) NULL
-  - accountCategory (varchar(50)) NULL
-  - balance (varchar(50)) NOT NULL
-  - currency (varchar(3)) NOT NULL
-
-🔹 Table: categories
-  - categoryId (bigint(20)) NOT NULL
-  - categoryName (varchar(255)) NOT NULL
-  - categoryType (varchar(50)) NULL
-  - predefined (tinyint(1)) NULL
-
-🔹 Table: subcategories
-  - subCategoryId (bigint(20)) NOT NULL
-  - categoryId (bigint(20)) NOT NULL
-  - subCategoryName (varchar(255)) NOT NULL
-  - urgency (varchar(50)) NULL
-  - predefined (tinyint(1)) NULL
-
-🔹 Table: transactions
-  - transactionId (varchar(36)) NOT NULL
-  - accountId (bigint(20)) NOT NULL
-  - categoryId (bigint(20)) NOT NULL
-  - subcategoryId (bigint(20)) NOT NULL
-  - date (bigint(20)) NOT NULL
-  - amount (varchar(50)) NOT NULL
-  - type (varchar(50)) NULL
-  - frequency (varchar(50)) NULL
-  - currency (varchar(3)) NOT NULL
-  - description (text) NULL
-"""
-
-
-def natural_language_to_sql(nl_query: str) -> str:
-    schema = get_table_schema()
-    prompt = f"""
-You are a SQL assistant. Convert the following natural language request into a secure, read-only MySQL query.
-
-🧠 Important Rules:
-- Dates are stored as UNIX timestamps in **milliseconds** (e.g., 1748754000000). Use `FROM_UNIXTIME(date/1000)` to convert to MySQL DATETIME.
-- Do not include any write operations (INSERT, UPDATE, DELETE, DROP).
-- You may query across multiple accounts.
-- Use only SELECT queries, join relevant tables when necessary.
-
-📂 Categories (categoryId → categoryName):
-1 → Food  
-2 → Transport  
-3 → Housing  
-4 → Entertainment  
-5 → Salary  
-6 → Utilities  
-7 → Healthcare  
-8 → Education  
-9 → Savings  
-10 → Miscellaneous
-
-📑 Subcategories (categoryId → subCategoryName):
-1 → Groceries, Dining Out  
-2 → Public Transport, Fuel  
-3 → Rent, Mortgage  
-4 → Movies, Concerts  
-5 → Monthly Salary, Bonus  
-6 → Electricity, Water  
-7 → Doctor Visits, Medications  
-8 → Tuition, Books  
-9 → Emergency Fund, Retirement  
-10 → Gifts, Charity
-
-💡 `subcategories.urgency` field can only be one of:
-- 'Need'
-- 'Want'
-
-💡 `categories.categoryType` can only be:
-- 'Expense'
-- 'Income'
-
-Here is the database schema:
-{schema}
-
-Natural language: "{nl_query}"
-
-Return only the SQL query (MySQL-compatible), no explanations.
-"""
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-    )
-
-    return response.text.strip("`")
-
-def generate_natural_language_response(original_query: str, sql_query: str, query_results: str) -> str:
-    """Generate a natural language response based on the query and its results"""
-    schema = get_table_schema()
-
-    prompt = f"""
-You are a helpful financial assistant. A user asked a question about their financial data, and you executed a SQL query to get the answer.
-Read the data from the SQL result and give a summary of the answer. Make sure the tone is friendly and helpful to the user.
-Database Schema:
-{schema}
-
-User's Original Question: "{original_query}"
-
-SQL Query Executed: {sql_query}
-
-Query Results:
-{query_results}
-
-Please provide a clear, concise, and helpful natural language response to the user's original question based on the query results. 
-If there are no results, explain that appropriately. 
-Make the response conversational and easy to understand, avoiding technical jargon.
-Focus on answering the user's question directly and highlight key insights from the data.
-"""
-
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-    )
+def get_table_schema() -> str:
+    """Return the compact table schema, introspected from the database and cached"""
+    return get_schema().prompt
 
-    return response.text.strip()
 
+# Dialect of SQL generated for the analytics mirror; a query's dialect also says where it runs
+MIRROR_DIALECT = "duckdb"
 
-def execute_safe_query(sql: str, original_query: str):
-    if not is_read_only(sql):
-        raise ValueError("Only read-only queries are allowed.")
 
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SET SESSION max_execution_time=1000")
+def analytics_target(question: str) -> Optional[AnalyticsMirror]:
+    """The analytics mirror if the question asks for an aggregate and the mirror has been synced, else None."""
+    if not AGGREGATE_QUESTION.search(question):
+        return None
+    mirror = get_analytics_mirror()
+    return mirror if mirror is not None and mirror.ready else None
+
+
+def _target_for(question: str) -> Tuple[str, SchemaSnapshot]:
+    """Decides, once per question, which dialect (and so which database) its SQL is written for."""
+    mirror = analytics_target(question)
+    return (MIRROR_DIALECT, mirror.schema()) if mirror is not None else (DB_BACKEND, get_schema())
+
+
+def _mirror_for(dialect: str) -> Optional[AnalyticsMirror]:
+    """The mirror for SQL generated in MIRROR_DIALECT, None for the OLTP database."""
+    if dialect != MIRROR_DIALECT:
+        return None
+    mirror = get_analytics_mirror()
+    if mirror is None:
+        raise RuntimeError("The query was written for the analytics mirror, which is no longer available.")
+    return mirror
+
+
+def _nl2sql_prompt(nl_query: str, schema: SchemaSnapshot) -> str:
+    return f"""Write one read-only SELECT for the question; join tables as needed, any account. Return only SQL.
+{schema.notes}
+{schema.prompt}
+Q: {nl_query}"""
+
+
+def natural_language_to_sql(nl_query: str) -> Tuple[str, str]:
+    """Returns the generated SQL and its dialect, to be passed along wherever the SQL is run."""
+    cache = get_query_cache()
+    dialect, schema = _target_for(nl_query)
+    sql = cache.get_sql(nl_query, schema.version)
+    if sql is None:
+        start = time.perf_counter()
+        response = get_gemini_client().generate_sync(_nl2sql_prompt(nl_query, schema))
+        sql = response.text.strip("`")
+        cache.put_sql(nl_query, sql, time.perf_counter() - start, schema.version)
+    return sql, dialect
+
+
+async def natural_language_to_sql_async(nl_query: str) -> Tuple[str, str]:
+    cache = get_query_cache()
+    # Introspection only hits the database every SCHEMA_REFRESH_SECONDS, but keep it off the event loop
+    dialect, schema = await asyncio.to_thread(_target_for, nl_query)
+    # The cache reads and commits SQLite, so it goes to a thread as well
+    sql = await asyncio.to_thread(cache.get_sql, nl_query, schema.version)
+    if sql is None:
+        start = time.perf_counter()
+        response = await get_gemini_client().generate(_nl2sql_prompt(nl_query, schema))
+        sql = response.text.strip("`")
+        await asyncio.to_thread(cache.put_sql, nl_query, sql, time.perf_counter() - start, schema.version)
+    return sql, dialect
+
 
-        logging.info(f"Executing query: {sql}")
-        cursor.execute(sql)
+def _answer_prompt(original_query: str, sql_query: str, summary: str) -> str:
+    return f"""You are a friendly financial assistant. Answer the user's question from the SQL result summary below.
+Be concise and conversational, avoid technical jargon, and highlight the key figures. Aggregates cover all rows.
+Question: "{original_query}"
+SQL: {sql_query}
+{summary}"""
 
-        columns = [desc[0] for desc in cursor.description]
 
-        # Fetch rows and map to dict
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+def generate_natural_language_response(original_query: str, sql_query: str, query_results: List[Dict],
+                                       has_more: bool = False) -> str:
+    """Generate a natural language response from a summary of the query results"""
+    summary = summarize_results(query_results)
+    if has_more:
+        summary += "\nThis is the first page only; more rows follow."
+    prompt = _answer_prompt(original_query, sql_query, summary)
 
-        # Generate natural language response
-        nl_response = generate_natural_language_response(original_query, sql, results)
+    response = get_gemini_client().generate_sync(prompt)
+
+    return response.text.strip()
+
+
+async def summarize_streamed_results(original_query: str, sql_query: str, summary: ResultSummary,
+                                     dialect: str = DB_BACKEND) -> str:
+    """Answer for a result that was streamed rather than fetched, from its running summary."""
+    nl_response = summary.template()
+    if nl_response is not None:
+        return nl_response
+
+    cache = get_query_cache()
+    nl_response = await asyncio.to_thread(cache.get_answer, sql_query, original_query, dialect)
+    if nl_response is None:
+        start = time.perf_counter()
+        response = await get_gemini_client().generate(_answer_prompt(original_query, sql_query, summary.render()))
+        nl_response = response.text.strip()
+        await asyncio.to_thread(
+            cache.put_answer, sql_query, original_query, nl_response, time.perf_counter() - start, dialect
+        )
+    return nl_response
+
+
+def synthesize_response(sql: str, original_query: str, results: List[Dict], has_more: bool = False,
+                        dialect: str = DB_BACKEND) -> str:
+    """Templates for empty, scalar and small results; only larger or partial results go to the LLM."""
+    nl_response = None if has_more else template_response(results)
+    if nl_response is not None:
+        return nl_response
+
+    cache = get_query_cache()
+    nl_response = cache.get_answer(sql, original_query, dialect)
+    if nl_response is None:
+        start = time.perf_counter()
+        nl_response = generate_natural_language_response(original_query, sql, results, has_more)
+        cache.put_answer(sql, original_query, nl_response, time.perf_counter() - start, dialect)
+    return nl_response
+
+
+def execute_safe_query(sql: str, original_query: str, raw_only: bool = False,
+                       page_size: int = QUERY_PAGE_SIZE, offset: int = 0, dialect: str = DB_BACKEND):
+    """
+    Runs one page of a read-only query and phrases the answer. Returns (results, nl_response, next_offset):
+    nl_response is None when raw_only is set, next_offset is None on the last page, and all three are None on a
+    database error. `dialect` is the one the SQL was generated for; MIRROR_DIALECT runs it on the analytics mirror.
+    """
+    mirror = _mirror_for(dialect)
+    guard = get_query_guard()
+    guard.check(sql, explain=False, dialect=dialect, tables=MIRROR_TABLES if mirror is not None else None)
+
+    # Whatever the LLM wrote, never read more than one page (plus a row to detect the next one)
+    page = paginate(sql, min(page_size, QUERY_MAX_PAGE_SIZE), offset, dialect=dialect)
+    if mirror is None:
+        # Raises QueryRejected when the plan is over budget; on the mirror a deadline interrupts the query instead
+        guard.check(page.sql)
+    cache = get_query_cache()
+    try:
+        results = cache.get_results(page.sql, dialect)
+        if results is None and mirror is not None:
+            start = time.perf_counter()
+            logging.info(f"Executing query on the analytics mirror: {page.sql}")
+            with span("analytics_db"):
+                results = mirror.execute(page.sql)
+            cache.put_results(page.sql, results, time.perf_counter() - start, dialect)
+        elif results is None:
+            start = time.perf_counter()
+            # Session settings (max_execution_time) are applied once per pooled connection
+            with get_db_pool().connection() as conn:
+                cursor = conn.cursor()
+
+                logging.info(f"Executing query: {page.sql}")
+                with span("db"):
+                    cursor.execute(page.sql)
+
+                    columns = [desc[0] for desc in cursor.description]
+
+                    # Fetch rows and map to dict
+                    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                cursor.close()
+            cache.put_results(page.sql, results, time.perf_counter() - start, dialect)
+
+        has_more = len(results) > page.limit
+        results = results[:page.limit]
+        next_offset = offset + page.limit if has_more else None
+        if raw_only:
+            return results, None, next_offset
+
+        # Generate natural language response (the connection is already back in the pool)
+        nl_response = synthesize_response(page.sql, original_query, results, has_more, dialect)
         print("Natural Language Response:")
         print(nl_response)
 
-        cursor.close()
-        conn.close()
-
-        return results, nl_response
+        return results, nl_response, next_offset
 
     except Exception as e:
         logging.error(f"Error during DB execution: {e}")
         print(f"Database Error: {e}")
-        return None, None
+        return None, None, None
+
+
+def stream_query_rows(sql: str, chunk_size: int = QUERY_STREAM_CHUNK_ROWS,
+                      dialect: str = DB_BACKEND) -> Iterator[List[Dict]]:
+    """
+    Runs a read-only query on a streaming cursor and yields its rows in chunks of dicts; the first chunk is
+    yielded as soon as it arrives, and at most one chunk is held at a time. The pooled connection stays checked
+    out until the generator finishes, and is discarded if it's closed early with rows left unread. At most
+    QUERY_STREAM_MAX_ROWS rows are read. SQL generated in MIRROR_DIALECT streams from the analytics mirror.
+    """
+    mirror = _mirror_for(dialect)
+    guard = get_query_guard()
+    guard.check(sql, explain=False, dialect=dialect, tables=MIRROR_TABLES if mirror is not None else None)
+    sql = paginate(sql, QUERY_STREAM_MAX_ROWS, probe=False, dialect=dialect).sql
+    if mirror is not None:
+        logging.info(f"Streaming query from the analytics mirror: {sql}")
+        yield from mirror.stream(sql, chunk_size)
+        return
+    guard.check(sql)
+
+    pool = get_db_pool()
+    with pool.connection() as conn:
+        # The statement stays open while the client reads at its own pace, far longer than the pooled session's
+        # DB_MAX_EXECUTION_TIME_MS allows; the connection's own limit is put back before it returns to the pool
+        set_execution_time(conn, QUERY_STREAM_MAX_EXECUTION_TIME_MS)
+        cursor = streaming_cursor(conn)
+        try:
+            logging.info(f"Streaming query: {sql}")
+            cursor.execute(sql)
+            columns = [desc[0] for desc in cursor.description]
+            while rows := cursor.fetchmany(chunk_size):
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            try:
+                cursor.close()
+                set_execution_time(conn, DB_MAX_EXECUTION_TIME_MS)
+            except Exception:
+                # Unread rows on an abandoned stream leave the connection mid-result, so it can't be reused
+                pool.discard(conn)
 
 
 def main():
@@ -201,14 +288,14 @@ def main():
     print("-" * 60)
 
     # Generate SQL
-    sql = natural_language_to_sql(nl_query)
+    sql, dialect = natural_language_to_sql(nl_query)
 
     # Clean and execute SQL
     cleaned_sql = extract_sql(sql)
     print(f"Generated SQL:\n{cleaned_sql}")
     print("-" * 60)
     try:
-        results, nl_response = execute_safe_query(cleaned_sql, nl_query)
+        results, nl_response, _ = execute_safe_query(cleaned_sql, nl_query, dialect=dialect)
         print(results)
     except ValueError as ve:
         print(f"❌ Rejected: {ve}")
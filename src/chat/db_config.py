@@ -1,14 +1,297 @@
+import asyncio
+import logging
 import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
-import mysql.connector
+from configs.config import (
+    DB_BACKEND,
+    SQLITE_DB_PATH,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_MAX_EXECUTION_TIME_MS
+)
 
 load_dotenv()
 
-def get_db_connection():
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+def _connect_mysql():
+    import mysql.connector
     return mysql.connector.connect(
         user=os.getenv("MYSQL_USER"),
         password=os.getenv("MYSQL_PASSWORD"),
         host=os.getenv("MYSQL_HOST"),
         database=os.getenv("MYSQL_DATABASE"),
-        connection_timeout=3
+        connection_timeout=3,
+        # Pooled connections are reused across requests; autocommit keeps each query on a fresh snapshot
+        autocommit=True
     )
+
+
+def _connect_sqlite():
+    # Connections are handed between worker threads by the pool, never shared concurrently
+    return sqlite3.connect(SQLITE_DB_PATH, check_same_thread=False)
+
+
+def _streaming_cursor_mysql(conn):
+    # Unbuffered: rows stay on the server until fetched instead of being read into memory on execute
+    return conn.cursor(buffered=False)
+
+
+def _ping_mysql(conn) -> None:
+    conn.ping(reconnect=False, attempts=1)
+
+
+def _ping_sqlite(conn) -> None:
+    conn.execute("SELECT 1").fetchall()
+
+
+def _is_mariadb(conn) -> bool:
+    return "mariadb" in conn.get_server_info().lower()
+
+
+def _execution_time_mysql(conn, ms: int) -> str:
+    # MariaDB calls the statement time limit max_statement_time and takes seconds
+    if _is_mariadb(conn):
+        return f"SET SESSION max_statement_time={ms / 1000}"
+    return f"SET SESSION max_execution_time={ms}"
+
+
+def _session_mysql(conn) -> List[str]:
+    statements = [_execution_time_mysql(conn, DB_MAX_EXECUTION_TIME_MS)]
+    if _is_mariadb(conn):
+        return statements
+    # From 8.0 UPDATE_TIME and TABLE_ROWS are cached statistics; report the live values instead. Earlier servers
+    # have no cache and no such variable
+    if tuple(conn.get_server_version()[:2]) >= (8, 0):
+        statements.append("SET SESSION information_schema_stats_expiry=0")
+    return statements
+
+
+def _disconnect_errors_mysql() -> Tuple[type, ...]:
+    from mysql.connector import errors
+    return errors.OperationalError, errors.InterfaceError
+
+
+BACKENDS: Dict[str, Dict[str, Any]] = {
+    "mysql": {
+        "connect": _connect_mysql,
+        "ping": _ping_mysql,
+        "streaming_cursor": _streaming_cursor_mysql,
+        # Errors after which the connection itself is unusable; anything else (a bad query) leaves it reusable
+        "disconnect_errors": _disconnect_errors_mysql,
+        # Session statements for a new connection, which depend on the server's flavour and version
+        "session": _session_mysql,
+        "execution_time": _execution_time_mysql,
+        # Table metadata only, never a scan: changes whenever rows of `transactions` are written (current on
+        # 8.0 thanks to information_schema_stats_expiry = 0); writes landing in the same second as one already
+        # seen, without changing the row count, are picked up when the result TTL expires
+        "data_version": (
+            "SELECT UPDATE_TIME, TABLE_ROWS FROM information_schema.TABLES"
+            " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transactions'"
+        ),
+    },
+    "sqlite": {
+        "connect": _connect_sqlite,
+        "ping": _ping_sqlite,
+        # sqlite3 cursors already step through the result lazily
+        "streaming_cursor": lambda conn: conn.cursor(),
+        # SQL errors, syntax included, are OperationalErrors in sqlite3 and leave the connection usable
+        "disconnect_errors": lambda: (sqlite3.InterfaceError,),
+        "session": lambda conn: ["PRAGMA query_only = ON"],
+        # SQLite has no statement time limit
+        "execution_time": lambda conn, ms: None,
+        # Catches inserts and deletes; in-place updates are only picked up when the result TTL expires
+        "data_version": "SELECT COUNT(*), MAX(rowid) FROM transactions",
+    },
+}
+
+
+def data_version_query() -> str:
+    return BACKENDS[DB_BACKEND]["data_version"]
+
+
+def streaming_cursor(conn):
+    """A cursor that fetches rows from the server as they are read with fetchmany()."""
+    return BACKENDS[DB_BACKEND]["streaming_cursor"](conn)
+
+
+def set_execution_time(conn, ms: int) -> None:
+    """Changes the statement time limit of a checked-out connection's session; a no-op on SQLite."""
+    statement = BACKENDS[DB_BACKEND]["execution_time"](conn, ms)
+    if statement:
+        cursor = conn.cursor()
+        cursor.execute(statement)
+        cursor.close()
+
+
+def get_db_connection():
+    """Opens a new, unpooled connection to the configured backend."""
+    return BACKENDS[DB_BACKEND]["connect"]()
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` open connections. Session settings run once when a connection is created, and every
+    checkout pings the connection first, replacing it if the ping fails. A connection goes back to the pool after
+    use unless a driver error in `disconnect_errors` escaped, or it was discard()ed.
+    """
+
+    def __init__(self, connect: Callable, ping: Callable, session_statements: Callable[[Any], List[str]],
+                 disconnect_errors: Tuple[type, ...] = (),
+                 size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT_SECONDS):
+        self.size = size
+        self.timeout = timeout
+        self._connect = connect
+        self._ping = ping
+        self._session_statements = session_statements
+        self._disconnect_errors = disconnect_errors
+        self._discarded = set()
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self.in_use = 0
+        self.created = 0
+        self.health_check_failures = 0
+        self.timeouts = 0
+
+    def acquire(self, timeout: Optional[float] = None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_new_if_allowed()
+                if conn is not None:
+                    return self._checked_out(conn)
+                try:
+                    conn = self._idle.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeoutError(f"No database connection available within {self.timeout}s")
+
+            try:
+                self._ping(conn)
+                return self._checked_out(conn)
+            except Exception as e:
+                logging.warning(f"Discarding unhealthy pooled connection: {e}")
+                with self._lock:
+                    self.health_check_failures += 1
+                self._close(conn)
+
+    def release(self, conn, broken: bool = False):
+        with self._lock:
+            self.in_use -= 1
+            broken = id(conn) in self._discarded or broken
+            self._discarded.discard(id(conn))
+        if broken:
+            self._close(conn)
+        else:
+            self._idle.put(conn)
+
+    def discard(self, conn):
+        """Marks a checked-out connection to be closed rather than pooled when it is released."""
+        with self._lock:
+            self._discarded.add(id(conn))
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except self._disconnect_errors:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    @asynccontextmanager
+    async def connection_async(self, timeout: Optional[float] = None):
+        """Like connection(), but waits for a free connection on a worker thread instead of the event loop."""
+        conn = await asyncio.to_thread(self.acquire, timeout)
+        broken = False
+        try:
+            yield conn
+        # A cancelled await may leave a worker thread still using the connection
+        except (asyncio.CancelledError, *self._disconnect_errors):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "created": self.created,
+                "health_check_failures": self.health_check_failures,
+                "timeouts": self.timeouts,
+            }
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _open_new_if_allowed(self):
+        with self._lock:
+            if self._open >= self.size:
+                return None
+            self._open += 1
+        conn = None
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            for statement in self._session_statements(conn):
+                cursor.execute(statement)
+            cursor.close()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            if conn is not None:
+                conn.close()
+            raise
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _checked_out(self, conn):
+        with self._lock:
+            self.in_use += 1
+        return conn
+
+    def _close(self, conn):
+        with self._lock:
+            self._open -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            backend = BACKENDS[DB_BACKEND]
+            _pool = ConnectionPool(backend["connect"], backend["ping"], backend["session"], backend["disconnect_errors"]())
+        return _pool
@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+from configs.config import DB_BACKEND, QUERY_PAGE_TOKEN_SECRET
+
+# Tokens are signed so a client can't page through SQL it didn't get from us
+_SECRET = QUERY_PAGE_TOKEN_SECRET.encode("utf-8")
+if not _SECRET:
+    # Not the root logger: this runs on import, before chat.chat sets up query.log
+    logging.getLogger(__name__).warning(
+        "QUERY_PAGE_TOKEN_SECRET is not set; page tokens are signed with a per-process key and are rejected by "
+        "other API workers and after a restart"
+    )
+    _SECRET = secrets.token_bytes(32)
+
+
+class InvalidPageToken(ValueError):
+    """Raised for page tokens that were tampered with or signed by another secret."""
+
+
+class Page(NamedTuple):
+    sql: str     # the query with this page's LIMIT/OFFSET applied
+    limit: int   # rows to return; one extra is fetched to tell whether more follow
+    offset: int  # offset into the original query's result
+
+
+def _literal_int(node: Optional[exp.Expression]) -> Optional[int]:
+    value = node.args.get("expression") if node is not None else None
+    if isinstance(value, exp.Literal) and not value.is_string:
+        return int(value.this)
+    return None
+
+
+def paginate(sql: str, page_size: int, offset: int = 0, probe: bool = True, dialect: str = DB_BACKEND) -> Page:
+    """
+    Rewrites a SELECT so it returns page_size rows starting at `offset` (plus one more with `probe`, to tell
+    whether another page follows), keeping any LIMIT/OFFSET the query already had as the outer bounds. Queries
+    whose limit isn't a plain number are wrapped in a subquery instead.
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read=dialect)
+    except sqlglot.errors.ParseError as e:
+        raise ValueError(f"Could not parse the generated SQL: {e}")
+    if not isinstance(tree, exp.Query):
+        raise ValueError("Only SELECT queries can be paginated.")
+
+    limit_node, offset_node = tree.args.get("limit"), tree.args.get("offset")
+    query_limit, query_offset = _literal_int(limit_node), _literal_int(offset_node)
+    if (limit_node is not None and query_limit is None) or (offset_node is not None and query_offset is None):
+        tree = exp.select("*").from_(tree.subquery("q"))
+        query_limit, query_offset = None, None
+    query_offset = query_offset or 0
+
+    limit = page_size if query_limit is None else max(0, min(page_size, query_limit - offset))
+    # The extra row only tells whether another page exists, so skip it when the query's own LIMIT ends here
+    more_possible = probe and (query_limit is None or offset + limit < query_limit)
+    tree = tree.limit(limit + 1 if more_possible else limit, copy=False)
+    if query_offset + offset:
+        tree = tree.offset(query_offset + offset, copy=False)
+    return Page(tree.sql(dialect=dialect), limit, offset)
+
+
+def _sign(payload: bytes) -> str:
+    return hmac.new(_SECRET, payload, hashlib.sha256).hexdigest()[:32]
+
+
+def encode_page_token(sql: str, offset: int, dialect: str = DB_BACKEND) -> str:
+    """
+    Opaque token for the page starting at `offset` of `sql` (the query as generated, before pagination), which
+    also carries the dialect the SQL was generated for, so later pages run where the first one did.
+    """
+    payload = base64.urlsafe_b64encode(
+        json.dumps({"sql": sql, "offset": offset, "dialect": dialect}).encode("utf-8")
+    )
+    return f"{payload.decode('ascii')}.{_sign(payload)}"
+
+
+def decode_page_token(token: str) -> Tuple[str, int, str]:
+    payload, _, signature = token.encode("ascii", "ignore").rpartition(b".")
+    if not payload or not hmac.compare_digest(_sign(payload), signature.decode("ascii")):
+        raise InvalidPageToken("Invalid page token.")
+    data = json.loads(base64.urlsafe_b64decode(payload))
+    return data["sql"], int(data["offset"]), data.get("dialect", DB_BACKEND)
+
+
+def to_columnar(results: List[Dict]) -> Dict:
+    """{"columns": [...], "values": [[...], ...]} with one value array per column, so keys aren't repeated per row."""
+    columns = list(results[0].keys()) if results else []
+    return {"columns": columns, "values": [[row[column] for row in results] for column in columns]}
@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import List, Optional
+
+from cache.sqlite_store import SQLiteTTLCache
+from chat.db_config import get_db_pool, data_version_query
+from configs.config import (
+    DB_BACKEND,
+    QUERY_SQL_CACHE_PATH,
+    QUERY_SQL_CACHE_TTL_SECONDS,
+    QUERY_SQL_CACHE_MAX_ENTRIES,
+    QUERY_RESULT_CACHE_TTL_SECONDS,
+    QUERY_RESULT_CACHE_MAX_ENTRIES,
+    QUERY_DATA_VERSION_CHECK_SECONDS
+)
+
+
+def normalize_question(question: str) -> str:
+    """'How much did I spend on food this month?' and 'how much did i spend on food this month' share a key."""
+    question = re.sub(r"[^\w\s%]", " ", question.lower())
+    return re.sub(r"\s+", " ", question).strip()
+
+
+def normalize_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql.strip().rstrip(";")).strip()
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """
+    Two levels in front of /query:
+    - normalized question -> generated SQL (long-lived, persisted), which skips the NL2SQL LLM call;
+    - SQL -> rows, and (SQL, question) -> natural-language answer (short TTL, in memory), which skip the database
+      and the summary LLM call. These are keyed by a fingerprint of the `transactions` table, so any write to it
+      makes the old entries unreachable.
+    """
+
+    def __init__(self):
+        self.sql_cache = SQLiteTTLCache(
+            QUERY_SQL_CACHE_PATH, QUERY_SQL_CACHE_TTL_SECONDS, QUERY_SQL_CACHE_MAX_ENTRIES, table="question_sql"
+        )
+        self.result_cache = SQLiteTTLCache(
+            "", QUERY_RESULT_CACHE_TTL_SECONDS, QUERY_RESULT_CACHE_MAX_ENTRIES, table="sql_results"
+        )
+        self._lock = threading.Lock()
+        self._data_version = ""
+        self._checked_at = 0.0
+        self._generation = 0
+
+    def get_sql(self, question: str, schema_version: str = "") -> Optional[str]:
+        cached = self.sql_cache.get(f"{schema_version}:{normalize_question(question)}")
+        return cached[0] if cached else None
+
+    def put_sql(self, question: str, sql: str, cost_seconds: float = 0.0, schema_version: str = ""):
+        # Keyed by schema version so a migration or new category never serves SQL written for the old schema
+        self.sql_cache.set(f"{schema_version}:{normalize_question(question)}", sql, cost_seconds)
+
+    def get_results(self, sql: str, dialect: str = DB_BACKEND) -> Optional[List]:
+        cached = self.result_cache.get(self._result_key("rows", dialect, sql))
+        return cached[0] if cached else None
+
+    def put_results(self, sql: str, results: List, cost_seconds: float = 0.0, dialect: str = DB_BACKEND):
+        self.result_cache.set(self._result_key("rows", dialect, sql), results, cost_seconds)
+
+    def get_answer(self, sql: str, question: str, dialect: str = DB_BACKEND) -> Optional[str]:
+        cached = self.result_cache.get(self._result_key("answer", dialect, sql, normalize_question(question)))
+        return cached[0] if cached else None
+
+    def put_answer(self, sql: str, question: str, answer: str, cost_seconds: float = 0.0,
+                   dialect: str = DB_BACKEND):
+        self.result_cache.set(
+            self._result_key("answer", dialect, sql, normalize_question(question)), answer, cost_seconds
+        )
+
+    def invalidate_results(self):
+        """Drops every cached result; call after writing to `transactions` from this process."""
+        with self._lock:
+            self._generation += 1
+            self._checked_at = 0.0
+        self.result_cache.clear()
+
+    def data_version(self) -> str:
+        """Fingerprint of the `transactions` table, re-read at most every QUERY_DATA_VERSION_CHECK_SECONDS."""
+        with self._lock:
+            if time.monotonic() - self._checked_at < QUERY_DATA_VERSION_CHECK_SECONDS:
+                return f"{self._generation}:{self._data_version}"
+
+        try:
+            with get_db_pool().connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(data_version_query())
+                version = repr(cursor.fetchall())
+                cursor.close()
+        except Exception as e:
+            # Without a fingerprint nothing can be trusted; a unique version makes every lookup miss
+            logging.warning(f"Could not read transactions data version: {e}")
+            version = f"unknown-{time.time_ns()}"
+
+        with self._lock:
+            self._data_version = version
+            self._checked_at = time.monotonic()
+            return f"{self._generation}:{self._data_version}"
+
+    def stats(self):
+        return {"sql": self.sql_cache.stats(), "results": self.result_cache.stats()}
+
+    def _result_key(self, kind: str, dialect: str, sql: str, *extra: str) -> str:
+        # The same SQL reads different data on the analytics mirror (which lags behind its sync) and the database
+        return _digest(kind, dialect, self.data_version(), normalize_sql(sql), *extra)
+
+
+_query_cache: Optional[QueryCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache()
+        return _query_cache
@@ -1,13 +1,220 @@
+import logging
 import re
+import threading
+import time
+from typing import Collection, Dict, NamedTuple, Optional
 
-READ_ONLY_COMMANDS = {"SELECT", "SHOW", "DESCRIBE", "EXPLAIN"}
-
-def is_read_only(query: str) -> bool:
-    # Extract the first word (command) from the SQL query
-    return True
-    # command_match = re.match(r"^\s*(\w+)", query, re.IGNORECASE)
-    # if not command_match:
-    #     return False
-    #
-    # command = command_match.group(1).upper()
-    # return command in READ_ONLY_COMMANDS
+import sqlglot
+from sqlglot import exp
+
+from cache.sqlite_store import SQLiteTTLCache
+from chat.db_config import get_db_pool
+from observability.tracing import span
+from configs.config import (
+    DB_BACKEND,
+    GUARD_EXPLAIN,
+    GUARD_MAX_ESTIMATED_ROWS,
+    GUARD_FULL_SCAN_TABLES,
+    GUARD_MAX_FULL_SCAN_ROWS,
+    GUARD_DECISION_TTL_SECONDS,
+    GUARD_DECISION_CACHE_SIZE
+)
+
+# Nodes that write, change the schema, or run something sqlglot couldn't parse, wherever they appear in the tree
+WRITE_NODES = tuple(
+    getattr(exp, name) for name in
+    ("Insert", "Update", "Delete", "Merge", "Create", "Drop", "Alter", "AlterTable", "TruncateTable", "Command",
+     "Set", "Use", "Transaction", "Commit", "Rollback", "Into", "Lock", "LoadData")
+    if hasattr(exp, name)
+)
+
+# Functions with side effects, that stall the server on purpose, or that read files (DuckDB's readers)
+FORBIDDEN_FUNCTIONS = {
+    "SLEEP", "BENCHMARK", "LOAD_FILE", "GET_LOCK", "RELEASE_LOCK", "PG_SLEEP",
+    "READ_CSV", "READ_CSV_AUTO", "READ_PARQUET", "PARQUET_SCAN", "READ_JSON", "READ_JSON_AUTO",
+    "READ_NDJSON", "READ_TEXT", "READ_BLOB", "GLOB", "SNIFF_CSV",
+}
+
+
+class QueryRejected(ValueError):
+    """Raised for SQL the guard won't run; `reason` is "unparseable", "not_read_only" or "too_expensive"."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class PlanEstimate(NamedTuple):
+    rows: int                     # estimated rows examined, multiplied across joins
+    full_scans: Dict[str, int]    # budgeted tables read without an index -> their estimated rows
+
+
+def _check_tables(tree: exp.Query, tables: Collection[str]) -> None:
+    """Rejects table functions and any table outside `tables` other than the query's own CTEs."""
+    allowed = {t.lower() for t in tables} | {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    for table in tree.find_all(exp.Table):
+        if not isinstance(table.this, exp.Identifier):
+            raise QueryRejected("not_read_only", "Table functions are not allowed.")
+        qualifier = table.args.get("catalog") or table.args.get("db")
+        if (qualifier is not None and table.db.lower() != "main") or table.name.lower() not in allowed:
+            raise QueryRejected("not_read_only", f"Table {table.sql()} is not available.")
+
+
+def parse_read_only(query: str, dialect: str = DB_BACKEND, tables: Optional[Collection[str]] = None) -> exp.Query:
+    """
+    Parses the query and returns it if it is exactly one read-only SELECT (or UNION of SELECTs). With `tables`,
+    it may only read those tables (or its own CTEs), and not from table functions.
+    """
+    try:
+        statements = [s for s in sqlglot.parse(query, read=dialect) if s is not None]
+    except sqlglot.errors.SqlglotError as e:
+        raise QueryRejected("unparseable", f"Could not parse the generated SQL: {e}")
+
+    if len(statements) != 1:
+        raise QueryRejected("not_read_only", "Only a single SQL statement is allowed.")
+    tree = statements[0]
+    if not isinstance(tree, exp.Query):
+        raise QueryRejected("not_read_only", "Only read-only queries are allowed.")
+
+    for node in tree.walk():
+        if isinstance(node, WRITE_NODES):
+            raise QueryRejected("not_read_only", "Only read-only queries are allowed.")
+        if isinstance(node, exp.Func):
+            name = (node.name if isinstance(node, exp.Anonymous) else node.sql_name()).upper()
+            if name in FORBIDDEN_FUNCTIONS:
+                raise QueryRejected("not_read_only", f"Function {name} is not allowed.")
+    if tables is not None:
+        _check_tables(tree, tables)
+    return tree
+
+
+def is_read_only(query: str, dialect: str = DB_BACKEND, tables: Optional[Collection[str]] = None) -> bool:
+    try:
+        parse_read_only(query, dialect, tables)
+        return True
+    except QueryRejected:
+        return False
+
+
+def _explain_mysql(cursor, query: str) -> PlanEstimate:
+    cursor.execute(f"EXPLAIN {query}")
+    columns = [desc[0] for desc in cursor.description]
+    # Rows multiply across the tables joined within one SELECT block and add up across blocks
+    blocks: Dict = {}
+    full_scans: Dict[str, int] = {}
+    for row in (dict(zip(columns, values)) for values in cursor.fetchall()):
+        rows = int(row.get("rows") or 1)
+        blocks[row.get("id")] = blocks.get(row.get("id"), 1) * max(rows, 1)
+        if row.get("type") == "ALL" and row.get("table") in GUARD_FULL_SCAN_TABLES:
+            full_scans[row["table"]] = max(full_scans.get(row["table"], 0), rows)
+    return PlanEstimate(sum(blocks.values()), full_scans)
+
+
+_SQLITE_STEP = re.compile(r"^(SCAN|SEARCH)(?: TABLE)? (\w+)")
+
+
+def _explain_sqlite(cursor, query: str) -> PlanEstimate:
+    # SQLite plans carry no row estimates, so table sizes stand in: a scan reads the whole table and an index
+    # search is assumed to read a tenth of it
+    cursor.execute(f"EXPLAIN QUERY PLAN {query}")
+    steps = [_SQLITE_STEP.match(row[3]) for row in cursor.fetchall()]
+    sizes: Dict[str, int] = {}
+    estimate, full_scans = 1, {}
+    for step in filter(None, steps):
+        kind, table = step.groups()
+        if table not in sizes:
+            try:
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                sizes[table] = cursor.fetchone()[0]
+            except Exception:
+                sizes[table] = 1  # a CTE or subquery alias rather than a table
+        rows = sizes[table] if kind == "SCAN" else max(1, sizes[table] // 10)
+        estimate *= max(rows, 1)
+        if kind == "SCAN" and table in GUARD_FULL_SCAN_TABLES:
+            full_scans[table] = rows
+    return PlanEstimate(estimate, full_scans)
+
+
+def explain_query(conn, query: str) -> PlanEstimate:
+    cursor = conn.cursor()
+    try:
+        return _explain_sqlite(cursor, query) if DB_BACKEND == "sqlite" else _explain_mysql(cursor, query)
+    finally:
+        cursor.close()
+
+
+def _over_budget(plan: PlanEstimate) -> Optional[str]:
+    for table, rows in plan.full_scans.items():
+        if rows > GUARD_MAX_FULL_SCAN_ROWS:
+            return f"Query would scan all ~{rows:,} rows of {table}; filter on an indexed column such as a date."
+    if plan.rows > GUARD_MAX_ESTIMATED_ROWS:
+        return f"Query would examine ~{plan.rows:,} rows, over the {GUARD_MAX_ESTIMATED_ROWS:,} row budget."
+    return None
+
+
+class QueryGuard:
+    """
+    Accepts single read-only statements and, with GUARD_EXPLAIN, checks their plan against the row budgets
+    before they run. Decisions are cached per normalized SQL (sqlglot's rendering of the parsed query) for
+    GUARD_DECISION_TTL_SECONDS, so repeat queries skip the EXPLAIN round trip.
+    """
+
+    def __init__(self):
+        self.decisions = SQLiteTTLCache(
+            "", GUARD_DECISION_TTL_SECONDS, GUARD_DECISION_CACHE_SIZE, table="guard_decisions"
+        )
+        self._lock = threading.Lock()
+        self.explained = 0
+        self.rejected: Dict[str, int] = {}
+
+    def check(self, query: str, explain: bool = GUARD_EXPLAIN, dialect: str = DB_BACKEND,
+              tables: Optional[Collection[str]] = None) -> None:
+        """
+        Raises QueryRejected unless the query may run; explain=False only checks that it is read-only, and
+        `tables` limits what it may read. The plan check always targets the OLTP database.
+        """
+        try:
+            tree = parse_read_only(query, dialect, tables)
+            if explain:
+                self._check_cost(tree.sql(dialect=DB_BACKEND))
+        except QueryRejected as e:
+            with self._lock:
+                self.rejected[e.reason] = self.rejected.get(e.reason, 0) + 1
+            raise
+
+    def _check_cost(self, normalized: str) -> None:
+        cached = self.decisions.get(normalized)
+        if cached is None:
+            start = time.perf_counter()
+            try:
+                with get_db_pool().connection() as conn, span("db_explain"):
+                    plan = explain_query(conn, normalized)
+            except Exception as e:
+                # Let execution report database errors; max_execution_time still bounds the query
+                logging.warning(f"EXPLAIN failed, skipping the cost check: {e}")
+                return
+            with self._lock:
+                self.explained += 1
+            verdict = _over_budget(plan)
+            logging.info(f"Plan for {normalized}: {plan} -> {verdict or 'ok'}")
+            self.decisions.set(normalized, verdict, time.perf_counter() - start)
+        else:
+            verdict = cached[0]
+        if verdict:
+            raise QueryRejected("too_expensive", verdict)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"explained": self.explained, "rejected": dict(self.rejected), "decisions": self.decisions.stats()}
+
+
+_guard: Optional[QueryGuard] = None
+_guard_lock = threading.Lock()
+
+
+def get_query_guard() -> QueryGuard:
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = QueryGuard()
+        return _guard
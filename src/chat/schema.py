@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from chat.db_config import get_db_pool
+from configs.config import DB_BACKEND, NL2SQL_TABLES, SCHEMA_REFRESH_SECONDS
+
+# Dialect hints for the columns whose storage doesn't match their meaning
+DIALECT_NOTES = {
+    "mysql": (
+        "MySQL. transactions.date is epoch ms: FROM_UNIXTIME(date/1000). "
+        "transactions.amount is text: CAST(amount AS DECIMAL(12,2))."
+    ),
+    "sqlite": (
+        "SQLite. transactions.date is epoch ms: datetime(date/1000,'unixepoch'). "
+        "transactions.amount is text: CAST(amount AS REAL)."
+    ),
+}
+
+# Used when the database can't be reached; mirrors the production schema
+STATIC_SCHEMA = {
+    "tables": {
+        "accounts": [
+            {"name": "accountId", "type": "bigint", "nullable": False, "key": "PRI", "ref": None},
+            {"name": "accountIBAN", "type": "varchar(34)", "nullable": False, "key": "", "ref": None},
+            {"name": "accountTyp", "type": "varchar(50)", "nullable": True, "key": "", "ref": None},
+            {"name": "accountCategory", "type": "varchar(50)", "nullable": True, "key": "", "ref": None},
+            {"name": "balance", "type": "varchar(50)", "nullable": False, "key": "", "ref": None},
+            {"name": "currency", "type": "varchar(3)", "nullable": False, "key": "", "ref": None},
+        ],
+        "categories": [
+            {"name": "categoryId", "type": "bigint", "nullable": False, "key": "PRI", "ref": None},
+            {"name": "categoryName", "type": "varchar(255)", "nullable": False, "key": "", "ref": None},
+            {"name": "categoryType", "type": "varchar(50)", "nullable": True, "key": "", "ref": None},
+            {"name": "predefined", "type": "tinyint(1)", "nullable": True, "key": "", "ref": None},
+        ],
+        "subcategories": [
+            {"name": "subCategoryId", "type": "bigint", "nullable": False, "key": "PRI", "ref": None},
+            {"name": "categoryId", "type": "bigint", "nullable": False, "key": "", "ref": "categories"},
+            {"name": "subCategoryName", "type": "varchar(255)", "nullable": False, "key": "", "ref": None},
+            {"name": "urgency", "type": "varchar(50)", "nullable": True, "key": "", "ref": None},
+            {"name": "predefined", "type": "tinyint(1)", "nullable": True, "key": "", "ref": None},
+        ],
+        "transactions": [
+            {"name": "transactionId", "type": "varchar(36)", "nullable": False, "key": "PRI", "ref": None},
+            {"name": "accountId", "type": "bigint", "nullable": False, "key": "", "ref": "accounts"},
+            {"name": "categoryId", "type": "bigint", "nullable": False, "key": "", "ref": "categories"},
+            {"name": "subcategoryId", "type": "bigint", "nullable": False, "key": "", "ref": "subcategories"},
+            {"name": "date", "type": "bigint", "nullable": False, "key": "", "ref": None},
+            {"name": "amount", "type": "varchar(50)", "nullable": False, "key": "", "ref": None},
+            {"name": "type", "type": "varchar(50)", "nullable": True, "key": "", "ref": None},
+            {"name": "frequency", "type": "varchar(50)", "nullable": True, "key": "", "ref": None},
+            {"name": "currency", "type": "varchar(3)", "nullable": False, "key": "", "ref": None},
+            {"name": "description", "type": "text", "nullable": True, "key": "", "ref": None},
+        ],
+    },
+    # Only what the original hand-written prompt stated: category ids and names, subcategory names per category
+    # (their ids, urgency and each category's type are unknown without the database) and the allowed values
+    "categories": [
+        [1, "Food", None], [2, "Transport", None], [3, "Housing", None], [4, "Entertainment", None],
+        [5, "Salary", None], [6, "Utilities", None], [7, "Healthcare", None], [8, "Education", None],
+        [9, "Savings", None], [10, "Miscellaneous", None],
+    ],
+    "subcategories": [
+        [None, 1, "Groceries", None], [None, 1, "Dining Out", None], [None, 2, "Public Transport", None],
+        [None, 2, "Fuel", None], [None, 3, "Rent", None], [None, 3, "Mortgage", None], [None, 4, "Movies", None],
+        [None, 4, "Concerts", None], [None, 5, "Monthly Salary", None], [None, 5, "Bonus", None],
+        [None, 6, "Electricity", None], [None, 6, "Water", None], [None, 7, "Doctor Visits", None],
+        [None, 7, "Medications", None], [None, 8, "Tuition", None], [None, 8, "Books", None],
+        [None, 9, "Emergency Fund", None], [None, 9, "Retirement", None], [None, 10, "Gifts", None],
+        [None, 10, "Charity", None],
+    ],
+    "values": {"categories.categoryType": ["Expense", "Income"], "subcategories.urgency": ["Need", "Want"]},
+}
+
+
+class SchemaSnapshot(NamedTuple):
+    version: str  # hash of the introspected schema and lookup values
+    prompt: str   # compact rendering for LLM prompts
+    source: str   # "database", "static" or "analytics"
+    notes: str    # dialect hints for the prompt
+
+
+def _introspect_mysql_columns(cursor) -> Dict[str, List[Dict]]:
+    placeholders = ", ".join(["%s"] * len(NL2SQL_TABLES))
+    cursor.execute(
+        "SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE, c.COLUMN_KEY, k.REFERENCED_TABLE_NAME"
+        " FROM information_schema.COLUMNS c"
+        " LEFT JOIN information_schema.KEY_COLUMN_USAGE k ON k.TABLE_SCHEMA = c.TABLE_SCHEMA"
+        "  AND k.TABLE_NAME = c.TABLE_NAME AND k.COLUMN_NAME = c.COLUMN_NAME AND k.REFERENCED_TABLE_NAME IS NOT NULL"
+        f" WHERE c.TABLE_SCHEMA = DATABASE() AND c.TABLE_NAME IN ({placeholders})"
+        " ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION",
+        NL2SQL_TABLES
+    )
+    tables: Dict[str, List[Dict]] = {}
+    for table, column, column_type, nullable, key, ref in cursor.fetchall():
+        tables.setdefault(table, []).append({
+            "name": column, "type": column_type, "nullable": nullable == "YES", "key": key, "ref": ref
+        })
+    return tables
+
+
+def _introspect_sqlite_columns(cursor) -> Dict[str, List[Dict]]:
+    tables: Dict[str, List[Dict]] = {}
+    for table in NL2SQL_TABLES:
+        cursor.execute(f"PRAGMA foreign_key_list({table})")
+        refs = {row[3]: row[2] for row in cursor.fetchall()}
+        cursor.execute(f"PRAGMA table_info({table})")
+        for _, column, column_type, not_null, _, pk in cursor.fetchall():
+            tables.setdefault(table, []).append({
+                "name": column, "type": column_type.lower(), "nullable": not (not_null or pk),
+                "key": "PRI" if pk else "", "ref": refs.get(column)
+            })
+    return tables
+
+
+def introspect_schema(conn) -> Dict:
+    """Reads the NL2SQL tables' columns and the category/subcategory lookup values from the database."""
+    cursor = conn.cursor()
+    try:
+        if DB_BACKEND == "sqlite":
+            tables = _introspect_sqlite_columns(cursor)
+        else:
+            tables = _introspect_mysql_columns(cursor)
+
+        schema = {"tables": tables, "categories": [], "subcategories": []}
+        if "categories" in tables:
+            cursor.execute("SELECT categoryId, categoryName, categoryType FROM categories ORDER BY categoryId")
+            schema["categories"] = [list(row) for row in cursor.fetchall()]
+        if "subcategories" in tables:
+            cursor.execute(
+                "SELECT subCategoryId, categoryId, subCategoryName, urgency FROM subcategories"
+                " ORDER BY categoryId, subCategoryId"
+            )
+            schema["subcategories"] = [list(row) for row in cursor.fetchall()]
+        return schema
+    finally:
+        cursor.close()
+
+
+def schema_version(schema: Dict) -> str:
+    return hashlib.sha1(json.dumps(schema, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+
+
+def render_schema(schema: Dict) -> str:
+    """
+    One line per table, e.g. `transactions(transactionId varchar(36) PK, accountId bigint ->accounts, ...)`
+    with `?` marking nullable columns, followed by the categories with their subcategories.
+    """
+    lines = []
+    for table, columns in schema["tables"].items():
+        rendered = []
+        for column in columns:
+            text = f"{column['name']} {column['type']}{'?' if column['nullable'] else ''}"
+            if column["key"] == "PRI":
+                text += " PK"
+            if column["ref"]:
+                text += f" ->{column['ref']}"
+            rendered.append(text)
+        lines.append(f"{table}({', '.join(rendered)})")
+
+    if schema["categories"]:
+        subcategories: Dict = {}
+        for sub_id, category_id, name, urgency in schema["subcategories"]:
+            text = name if sub_id is None else f"{sub_id} {name}"
+            subcategories.setdefault(category_id, []).append(text + (f" [{urgency}]" if urgency else ""))
+        if all(row[0] is not None for row in schema["subcategories"]):
+            lines.append("categoryId name [categoryType]: subCategoryId subCategoryName [urgency]")
+        else:
+            lines.append("categoryId name: subCategoryName (match subcategories by name, their ids are not listed)")
+        for category_id, name, category_type in schema["categories"]:
+            head = f"{category_id} {name}" + (f" [{category_type}]" if category_type else "")
+            lines.append(f"{head}: {'; '.join(subcategories.get(category_id, []))}")
+    for column, values in schema.get("values", {}).items():
+        lines.append(f"{column} is one of {', '.join(repr(v) for v in values)}")
+    return "\n".join(lines)
+
+
+def dialect_notes() -> str:
+    return DIALECT_NOTES.get(DB_BACKEND, DIALECT_NOTES["mysql"])
+
+
+_snapshot: Optional[SchemaSnapshot] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_schema() -> SchemaSnapshot:
+    """
+    Returns the rendered schema. The database is re-read at most every SCHEMA_REFRESH_SECONDS and the prompt is
+    only re-rendered when the version hash changes; if the database can't be reached the last snapshot (or the
+    static fallback) is kept.
+    """
+    global _snapshot, _checked_at
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < SCHEMA_REFRESH_SECONDS:
+            return _snapshot
+
+        try:
+            with get_db_pool().connection() as conn:
+                schema = introspect_schema(conn)
+            if not schema["tables"]:
+                raise ValueError(f"none of {NL2SQL_TABLES} found")
+            source = "database"
+        except Exception as e:
+            logging.warning(f"Schema introspection failed, using {'cached' if _snapshot else 'static'} schema: {e}")
+            schema, source = STATIC_SCHEMA, "static"
+            if _snapshot is not None:
+                _checked_at = time.monotonic()
+                return _snapshot
+
+        version = schema_version(schema)
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = SchemaSnapshot(version, render_schema(schema), source, dialect_notes())
+        _checked_at = time.monotonic()
+        return _snapshot
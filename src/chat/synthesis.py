@@ -0,0 +1,170 @@
+import random
+import re
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from configs.config import (
+    SYNTHESIS_TEMPLATE_MAX_ROWS,
+    SYNTHESIS_TEMPLATE_MAX_COLUMNS,
+    SYNTHESIS_SAMPLE_ROWS
+)
+
+# Column names that are raw SQL expressions (SUM(CAST(amount AS ...)), COUNT(*)) rather than aliases
+_EXPRESSION = re.compile(r"[()*/+\s]")
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return "none"
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, (Decimal, float)):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def column_label(column: str) -> str:
+    """`total_spent` / `totalSpent` -> "Total spent"; unaliased expressions become "Result"."""
+    if _EXPRESSION.search(column):
+        return "Result"
+    words = re.sub(r"([a-z])([A-Z])", r"\1 \2", column).replace("_", " ").split()
+    return " ".join(words).capitalize() if words else "Result"
+
+
+def template_response(results: List[Dict]) -> Optional[str]:
+    """
+    Deterministic answer for empty, single-value and small tabular results, or None when the result is too big
+    to read well as a list and should be summarized by the LLM.
+    """
+    if not results:
+        return "I couldn't find any matching data."
+
+    columns = list(results[0].keys())
+    if len(results) == 1 and len(columns) == 1:
+        return f"{column_label(columns[0])}: {format_value(results[0][columns[0]])}"
+    if len(results) > SYNTHESIS_TEMPLATE_MAX_ROWS or len(columns) > SYNTHESIS_TEMPLATE_MAX_COLUMNS:
+        return None
+
+    labels = [column_label(column) for column in columns]
+    lines = [
+        ", ".join(f"{label}: {format_value(row[column])}" for label, column in zip(labels, columns))
+        for row in results
+    ]
+    if len(lines) == 1:
+        return lines[0]
+    return f"Found {len(lines)} results:\n" + "\n".join(f"- {line}" for line in lines)
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class ResultSummary:
+    """
+    Running summary of a result set that is fed rows in chunks: the row count, per-column aggregates, the first
+    rows (enough for a template answer) and a reservoir sample for the LLM. Memory is bounded by the column count,
+    the sample size and MAX_DISTINCT, not by the number of rows.
+    """
+
+    MAX_DISTINCT = 1000  # distinct values tracked per text column
+
+    def __init__(self, columns: List[str], sample_size: int = SYNTHESIS_SAMPLE_ROWS):
+        self.columns = columns
+        self.sample_size = sample_size
+        self.row_count = 0
+        self.head: List[Dict] = []
+        self._sample: List = []  # (row index, row), kept in result order when rendered
+        self._rng = random.Random(0)  # seeded so the same rows always produce the same prompt
+        # Columns stay numeric until a non-numeric value shows up; identifiers are never summed
+        self._numeric = {column: not column.lower().endswith("id") for column in columns}
+        self._numbers = {column: [0, 0.0, None, None] for column in columns}  # count, sum, min, max
+        self._counts = {column: Counter() for column in columns}
+        self._truncated = set()
+
+    def add(self, rows: List[Dict]) -> "ResultSummary":
+        for row in rows:
+            if len(self.head) < SYNTHESIS_TEMPLATE_MAX_ROWS:
+                self.head.append(row)
+            if len(self._sample) < self.sample_size:
+                self._sample.append((self.row_count, row))
+            else:
+                slot = self._rng.randrange(self.row_count + 1)
+                if slot < self.sample_size:
+                    self._sample[slot] = (self.row_count, row)
+            self.row_count += 1
+
+            for column in self.columns:
+                value = row[column]
+                if value is None:
+                    continue
+                if self._numeric[column]:
+                    number = _as_number(value)
+                    if number is None:
+                        self._numeric[column] = False
+                    else:
+                        stats = self._numbers[column]
+                        stats[0] += 1
+                        stats[1] += number
+                        stats[2] = number if stats[2] is None else min(stats[2], number)
+                        stats[3] = number if stats[3] is None else max(stats[3], number)
+                counts = self._counts[column]
+                key = format_value(value)
+                if key in counts or len(counts) < self.MAX_DISTINCT:
+                    counts[key] += 1
+                else:
+                    self._truncated.add(column)
+        return self
+
+    def template(self) -> Optional[str]:
+        """The deterministic answer, if the whole result fits a template."""
+        if self.row_count > len(self.head):
+            return None
+        return template_response(self.head)
+
+    def render(self) -> str:
+        """
+        Compact text for the LLM: row count, per-column aggregates over every row, and the sampled rows as a
+        pipe-separated table.
+        """
+        lines = [f"rows: {self.row_count}"]
+        for column in self.columns:
+            count, total, low, high = self._numbers[column]
+            if self._numeric[column] and count:
+                lines.append(
+                    f"{column}: sum {total:,.2f}, min {low:,.2f}, max {high:,.2f}, avg {total / count:,.2f}"
+                )
+            else:
+                counts = self._counts[column]
+                distinct = f"{len(counts)}+" if column in self._truncated else str(len(counts))
+                lines.append(f"{column}: {distinct} distinct, top "
+                             + ", ".join(f"{value} x{n}" for value, n in counts.most_common(5)))
+
+        sample = [row for _, row in sorted(self._sample, key=lambda entry: entry[0])]
+        lines.append(f"sample ({len(sample)} of {self.row_count} rows):"
+                     if len(sample) < self.row_count else "rows:")
+        lines.append(" | ".join(self.columns))
+        lines.extend(" | ".join(format_value(row[column]) for column in self.columns) for row in sample)
+        return "\n".join(lines)
+
+
+def summarize_results(results: List[Dict], sample_size: int = SYNTHESIS_SAMPLE_ROWS) -> str:
+    """Summary text for an already fetched result; see ResultSummary."""
+    columns = list(results[0].keys()) if results else []
+    return ResultSummary(columns, sample_size).add(results).render()
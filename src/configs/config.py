@@ -1 +1,143 @@
-OCR_LANGUAGES = ['ar', 'en']
\ No newline at end of file
+import os
+
+# OCR: EasyOCR can't mix Arabic, Chinese and Latin models in one reader, so there is one lazily loaded reader per
+# script ("script=lang+lang;..."). The first script's reader also runs text detection for all of them and is
+# tried first when routing a receipt to a script.
+OCR_SCRIPTS = {
+    script.strip(): [lang.strip() for lang in langs.split("+") if lang.strip()]
+    for script, _, langs in (
+        entry.partition("=")
+        for entry in os.getenv("OCR_SCRIPTS", "latin=en+fr+de+es;arabic=ar+en;chinese=ch_sim+en").split(";")
+        if entry.strip()
+    )
+}
+OCR_SCRIPT = os.getenv("OCR_SCRIPT", "auto")  # "auto" detects the script per image; a script name skips detection
+OCR_SCRIPT_SAMPLE_BOXES = int(os.getenv("OCR_SCRIPT_SAMPLE_BOXES", "8"))  # largest text boxes read to pick a script
+OCR_SCRIPT_ACCEPT_SCORE = float(os.getenv("OCR_SCRIPT_ACCEPT_SCORE", "0.6"))  # first script wins at this score
+
+# Categorization. Backends: "zero-shot" (CATEGORIZATION_MODEL through the transformers NLI pipeline), "distilled"
+# (the same pipeline over a distilled NLI model), "onnx" (int8-quantized ONNX Runtime export of an NLI model,
+# created under CATEGORIZATION_ONNX_PATH on first load) and "embedding" (nearest label by sentence embedding)
+CATEGORIZATION_BACKEND = os.getenv("CATEGORIZATION_BACKEND", "zero-shot")
+CATEGORIZATION_MODEL = os.getenv("CATEGORIZATION_MODEL", "facebook/bart-large-mnli")
+CATEGORIZATION_DISTILLED_MODEL = os.getenv("CATEGORIZATION_DISTILLED_MODEL", "valhalla/distilbart-mnli-12-3")
+CATEGORIZATION_ONNX_MODEL = os.getenv("CATEGORIZATION_ONNX_MODEL", CATEGORIZATION_MODEL)  # NLI model to export
+CATEGORIZATION_ONNX_PATH = os.getenv("CATEGORIZATION_ONNX_PATH", "onnx_models/nli-int8")
+CATEGORIZATION_EMBEDDING_MODEL = os.getenv("CATEGORIZATION_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+CATEGORIZATION_BATCH_SIZE = int(os.getenv("CATEGORIZATION_BATCH_SIZE", "32"))  # item names per classifier call
+CATEGORIZATION_MODEL_BATCH_SIZE = int(os.getenv("CATEGORIZATION_MODEL_BATCH_SIZE", "16"))  # NLI pairs per forward pass
+CATEGORY_CACHE_PATH = os.getenv("CATEGORY_CACHE_PATH", "category_cache.db")  # empty string keeps the cache in memory only
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "10000"))  # in-memory LRU entries
+# Cheap tiers tried before the cache and the model: "llm" keeps a valid category Gemini already returned, "rules"
+# matches item/vendor keywords (categorization/rules.py, extended by the JSON file at CATEGORY_RULES_PATH)
+CATEGORIZATION_TIERS = [t.strip() for t in os.getenv("CATEGORIZATION_TIERS", "llm,rules").split(",") if t.strip()]
+CATEGORY_RULES_PATH = os.getenv("CATEGORY_RULES_PATH", "")
+
+# Models listed here (comma separated registry names, e.g. "easyocr:latin,whisper") are loaded at API startup;
+# everything else is loaded on first use or through POST /warmup
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "").split(",") if name.strip()]
+
+# Pipeline stage pools: blocking OCR/ASR/LLM/DB work runs off the event loop with at most
+# <STAGE>_CONCURRENCY jobs running and <STAGE>_QUEUE_SIZE waiting; beyond that requests get a 503
+STAGE_EXECUTOR = os.getenv("STAGE_EXECUTOR", "thread")  # "thread" or "process" for the CPU-bound ocr/asr stages
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "2"))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "8"))
+ASR_CONCURRENCY = int(os.getenv("ASR_CONCURRENCY", "1"))
+ASR_QUEUE_SIZE = int(os.getenv("ASR_QUEUE_SIZE", "4"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "32"))
+DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", "4"))
+DB_QUEUE_SIZE = int(os.getenv("DB_QUEUE_SIZE", "16"))
+BUSY_RETRY_AFTER_SECONDS = int(os.getenv("BUSY_RETRY_AFTER_SECONDS", "5"))
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))  # files accepted by one /process/batch request
+
+# Image preprocessing before OCR
+PREPROCESS_FIX_ORIENTATION = os.getenv("PREPROCESS_FIX_ORIENTATION", "true").lower() == "true"
+PREPROCESS_MAX_LONG_EDGE = int(os.getenv("PREPROCESS_MAX_LONG_EDGE", "1600"))  # 0 disables downscaling
+PREPROCESS_GRAYSCALE = os.getenv("PREPROCESS_GRAYSCALE", "true").lower() == "true"
+PREPROCESS_AUTOCONTRAST = os.getenv("PREPROCESS_AUTOCONTRAST", "true").lower() == "true"
+PREPROCESS_CROP_RECEIPT = os.getenv("PREPROCESS_CROP_RECEIPT", "false").lower() == "true"
+
+# /process result cache, keyed by a hash of the uploaded bytes and the processing mode
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "result_cache.db")  # empty string keeps it in memory
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+
+# Speech
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")  # tiny, base, small, medium, large-v3, or a local path
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")  # "cuda" if a GPU is available
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # threads per transcription; 0 lets CTranslate2 decide
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))  # transcriptions the model runs in parallel
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))  # speech chunks per forward pass in bulk transcription
+WHISPER_VAD_FILTER = os.getenv("WHISPER_VAD_FILTER", "true").lower() == "true"  # skip silence with Silero VAD
+WHISPER_VAD_MIN_SILENCE_MS = int(os.getenv("WHISPER_VAD_MIN_SILENCE_MS", "500"))
+# Audio formats spooled to a temp file before decoding; everything else is decoded from memory.
+# Uploads whose format can't be recognised from their magic bytes are always spooled.
+AUDIO_SPOOL_FORMATS = {fmt.strip() for fmt in os.getenv("AUDIO_SPOOL_FORMATS", "").split(",") if fmt.strip()}
+
+# Gemini
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# "genai", "stub" (offline, canned responses) or "record" (genai, saving responses for the stub to replay)
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "genai")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))  # calls in flight per client
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "0.5"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "16"))
+GEMINI_STUB_RESPONSES_PATH = os.getenv("GEMINI_STUB_RESPONSES_PATH", "")  # JSON of prompt key -> response text
+GEMINI_STUB_LATENCY_MS = int(os.getenv("GEMINI_STUB_LATENCY_MS", "0"))  # simulated round trip for the stub
+
+# NL2SQL database
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")  # "mysql", or "sqlite" as a local stand-in
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "budgetly.sqlite3")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "5"))  # wait for a free connection
+DB_MAX_EXECUTION_TIME_MS = int(os.getenv("DB_MAX_EXECUTION_TIME_MS", "1000"))
+
+# /query caches: question -> generated SQL, and SQL -> rows/answer until the transactions table changes
+QUERY_SQL_CACHE_PATH = os.getenv("QUERY_SQL_CACHE_PATH", "query_cache.db")
+QUERY_SQL_CACHE_TTL_SECONDS = int(os.getenv("QUERY_SQL_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+QUERY_SQL_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_SQL_CACHE_MAX_ENTRIES", "10000"))
+QUERY_RESULT_CACHE_TTL_SECONDS = int(os.getenv("QUERY_RESULT_CACHE_TTL_SECONDS", "60"))
+QUERY_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_RESULT_CACHE_MAX_ENTRIES", "1000"))
+QUERY_DATA_VERSION_CHECK_SECONDS = float(os.getenv("QUERY_DATA_VERSION_CHECK_SECONDS", "2"))
+
+# NL2SQL schema prompt
+NL2SQL_TABLES = [t.strip() for t in os.getenv("NL2SQL_TABLES", "accounts,categories,subcategories,transactions").split(",") if t.strip()]
+SCHEMA_REFRESH_SECONDS = float(os.getenv("SCHEMA_REFRESH_SECONDS", "300"))  # how often to re-check the live schema
+
+# /query answers: small results are phrased from templates, larger ones are summarized for the LLM
+SYNTHESIS_TEMPLATE_MAX_ROWS = int(os.getenv("SYNTHESIS_TEMPLATE_MAX_ROWS", "10"))
+SYNTHESIS_TEMPLATE_MAX_COLUMNS = int(os.getenv("SYNTHESIS_TEMPLATE_MAX_COLUMNS", "4"))
+SYNTHESIS_SAMPLE_ROWS = int(os.getenv("SYNTHESIS_SAMPLE_ROWS", "20"))  # rows shown to the LLM, beside aggregates
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "100"))  # LIMIT injected into generated SQL on /query
+QUERY_MAX_PAGE_SIZE = int(os.getenv("QUERY_MAX_PAGE_SIZE", "1000"))  # upper bound for a requested page_size
+# Signs /query next_page_tokens; must be shared by every API process, or tokens only work on the one that issued them
+QUERY_PAGE_TOKEN_SECRET = os.getenv("QUERY_PAGE_TOKEN_SECRET", "")
+QUERY_STREAM_MAX_ROWS = int(os.getenv("QUERY_STREAM_MAX_ROWS", "100000"))  # LIMIT injected on /query/stream
+QUERY_STREAM_CHUNK_ROWS = int(os.getenv("QUERY_STREAM_CHUNK_ROWS", "500"))  # rows per fetchmany()/event on /query/stream
+# Statement time limit while /query/stream reads rows at the client's pace, instead of DB_MAX_EXECUTION_TIME_MS
+QUERY_STREAM_MAX_EXECUTION_TIME_MS = int(os.getenv("QUERY_STREAM_MAX_EXECUTION_TIME_MS", "120000"))
+
+# NL2SQL guard: EXPLAIN generated queries and reject those over these budgets before running them
+GUARD_EXPLAIN = os.getenv("GUARD_EXPLAIN", "true").lower() == "true"
+GUARD_MAX_ESTIMATED_ROWS = int(os.getenv("GUARD_MAX_ESTIMATED_ROWS", "5000000"))  # rows examined, across joins
+GUARD_FULL_SCAN_TABLES = {t.strip() for t in os.getenv("GUARD_FULL_SCAN_TABLES", "transactions").split(",") if t.strip()}
+GUARD_MAX_FULL_SCAN_ROWS = int(os.getenv("GUARD_MAX_FULL_SCAN_ROWS", "500000"))  # unindexed reads of those tables
+GUARD_DECISION_TTL_SECONDS = int(os.getenv("GUARD_DECISION_TTL_SECONDS", "600"))
+GUARD_DECISION_CACHE_SIZE = int(os.getenv("GUARD_DECISION_CACHE_SIZE", "2000"))
+
+# Analytics mirror: typed DuckDB copy of transactions that aggregate /query questions are answered from
+ANALYTICS_MIRROR_ENABLED = os.getenv("ANALYTICS_MIRROR_ENABLED", "false").lower() == "true"  # needs duckdb
+ANALYTICS_MIRROR_PATH = os.getenv("ANALYTICS_MIRROR_PATH", "analytics.duckdb")
+ANALYTICS_SYNC_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_SYNC_INTERVAL_SECONDS", "60"))
+
+# Async receipt jobs: POST /jobs queues uploads in a SQLite file that `python -m jobs.worker` processes drain
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.db")  # must be shared by the API and its workers
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "1000"))  # submissions beyond this many waiting jobs get a 503
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))  # jobs one worker process runs at once
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))  # a job whose worker stops renewing is retried
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", str(24 * 3600)))  # finished jobs kept this long
+JOB_STATS_WINDOW_SECONDS = int(os.getenv("JOB_STATS_WINDOW_SECONDS", "300"))  # window for wait time and throughput
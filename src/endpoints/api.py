@@ -1,21 +1,18 @@
 # api.py
 import os
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
-from tempfile import NamedTemporaryFile
-from pathlib import Path
-from mimetypes import guess_type
-import shutil
 
-from input.image_handler import load_image
-from extraction.easyocr_extractor import extract_text_easyocr
-from speech.whisper_transcriber import transcribe_audio
-from structure.structure_llm import (
-    parse_receipt_with_gemini,
-    parse_receipt_image_with_gemini
-)
+from pipeline.receipt import process_file_cached, read_upload, get_result_cache
+from pipeline.stages import StageBusyError, stage_stats
+from models.registry import registry
+from llm.gemini import gemini_stats
+from observability.metrics import register_stats_collector, render_metrics
+from observability.tracing import add_timing_middleware, span
+from configs.config import BUSY_RETRY_AFTER_SECONDS
 
 load_dotenv()
 app = FastAPI(title="Receipt Processor API")
@@ -26,21 +23,24 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+add_timing_middleware(app)
+register_stats_collector({
+    "result_cache": lambda: get_result_cache().stats(),
+    "models": registry.stats,
+    "gemini": gemini_stats,
+    "stages": stage_stats,
+})
 
-def detect_file_type(file_path: str) -> str:
-    mime, _ = guess_type(file_path)
-    if mime:
-        if mime.startswith("image"):
-            return "image"
-        elif mime.startswith("audio"):
-            return "audio"
-    ext = Path(file_path).suffix.lower()
-    if ext in [".jpg", ".jpeg", ".png", ".bmp", ".tiff"]:
-        return "image"
-    elif ext in [".mp3", ".wav", ".m4a", ".ogg"]:
-        return "audio"
-    return "unknown"
+@app.exception_handler(StageBusyError)
+async def stage_busy_handler(request, exc: StageBusyError):
+    """Fail fast when a pipeline stage is saturated instead of piling requests up"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)}
+    )
 
 @app.post("/process")
 async def process_receipt(
@@ -51,38 +51,37 @@ async def process_receipt(
     if not api_key:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set.")
 
-    # Save uploaded file to temp path
-    suffix = Path(file.filename).suffix
-    with NamedTemporaryFile(delete=False, suffix=suffix) as temp:
-        shutil.copyfileobj(file.file, temp)
-        temp_path = temp.name
-
-    file_type = detect_file_type(temp_path)
+    # Keep the upload in memory; its type comes from the magic bytes, its hash keys the result cache
+    with span("upload"):
+        upload = await run_in_threadpool(read_upload, await file.read(), file.filename or "")
 
     try:
-        if file_type == "image":
-            if e2e:
-                receipts = parse_receipt_image_with_gemini(temp_path, api_key)
-            else:
-                image = load_image(temp_path)
-                ocr_results = extract_text_easyocr(image)
-                text = "\n".join([t for t, _ in ocr_results])
-                receipts = parse_receipt_with_gemini(text, api_key)
-
-        elif file_type == "audio":
-            text = transcribe_audio(temp_path)
-            receipts = parse_receipt_with_gemini(text, api_key)
-        else:
+        if upload.file_type not in ("image", "audio"):
             raise HTTPException(status_code=400, detail="Unsupported file type.")
 
+        receipts, saved_seconds = await process_file_cached(upload, e2e, api_key)
+
         # Return structured receipt(s) as JSON
-        return JSONResponse([r.model_dump() for r in receipts])
+        cache_stats = await run_in_threadpool(get_result_cache().stats)
+        headers = {
+            "X-Cache": "HIT" if saved_seconds is not None else "MISS",
+            "X-Cache-Hit-Rate": str(cache_stats["hit_rate"]),
+        }
+        if saved_seconds is not None:
+            headers["X-Cache-Saved-Ms"] = str(round(saved_seconds * 1000))
+        return JSONResponse(receipts, headers=headers)
+
+    except (HTTPException, StageBusyError):
+        raise
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {e}")
 
-    finally:
-        os.remove(temp_path)
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = await run_in_threadpool(render_metrics)
+    return Response(body, media_type=content_type)
 
 if __name__ == "__main__":
     import uvicorn
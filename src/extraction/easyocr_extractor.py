@@ -1,12 +1,115 @@
-import easyocr
-from typing import List, Tuple
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
 import numpy as np
 from PIL import Image
-from configs.config import OCR_LANGUAGES
+from configs.config import OCR_SCRIPTS, OCR_SCRIPT, OCR_SCRIPT_SAMPLE_BOXES, OCR_SCRIPT_ACCEPT_SCORE
+from models.registry import registry
+from observability.tracing import span
 
-reader = easyocr.Reader(OCR_LANGUAGES, gpu=False)
+# The first configured script's reader owns the text detector; the others only load their recognizer
+PRIMARY_SCRIPT = next(iter(OCR_SCRIPTS))
 
-def extract_text_easyocr(image: Image.Image) -> List[Tuple[str, float]]:
-    image_np = np.array(image)
-    results = reader.readtext(image_np)
+# Letters that belong to each script, used to tell a reader's real output from what it makes of a foreign script
+SCRIPT_LETTERS = {
+    "latin": re.compile(r"[A-Za-zÀ-ɏ]"),
+    "arabic": re.compile(r"[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]"),
+    "chinese": re.compile(r"[㐀-䶿一-鿿]"),
+    "cyrillic": re.compile(r"[Ѐ-ӿ]"),
+    "devanagari": re.compile(r"[ऀ-ॿ]"),
+}
+
+_routed = Counter()
+_routed_lock = threading.Lock()
+
+
+def _reader_loader(script: str):
+    def load():
+        import easyocr
+        return easyocr.Reader(OCR_SCRIPTS[script], gpu=False, detector=script == PRIMARY_SCRIPT)
+    return load
+
+
+# Warmup loads the reader every image starts with; the other scripts' readers load when an image needs them
+for _script in OCR_SCRIPTS:
+    registry.register(f"easyocr:{_script}", _reader_loader(_script),
+                      warmup=_script == (PRIMARY_SCRIPT if OCR_SCRIPT == "auto" else OCR_SCRIPT))
+
+
+def _box_area(box) -> float:
+    x_min, x_max, y_min, y_max = box
+    return (x_max - x_min) * (y_max - y_min)
+
+
+def script_score(script: str, results) -> float:
+    """
+    Mean recognition confidence, scaled by the share of recognized letters that belong to the script. A reader
+    fed a script it doesn't know still returns text, but in its own alphabet and with low confidence.
+    """
+    if not results:
+        return 0.0
+    confidence = sum(c for _, _, c in results) / len(results)
+    letters = [ch for _, text, _ in results for ch in text if ch.isalpha()]
+    pattern = SCRIPT_LETTERS.get(script)
+    if not letters or pattern is None:
+        return confidence
+    return confidence * sum(1 for ch in letters if pattern.match(ch)) / len(letters)
+
+
+def detect_script(grey: np.ndarray, horizontal_list, free_list) -> str:
+    """
+    Picks the reader for an image by recognizing only its largest text boxes: the primary script is accepted
+    outright at OCR_SCRIPT_ACCEPT_SCORE, otherwise every script is tried on the same sample and the best one wins.
+    Readers for other scripts are only loaded when a sample gets that far.
+    """
+    sample = sorted(horizontal_list, key=_box_area, reverse=True)[:OCR_SCRIPT_SAMPLE_BOXES]
+    sample_free = [] if sample else free_list[:OCR_SCRIPT_SAMPLE_BOXES]
+    if not sample and not sample_free:
+        return PRIMARY_SCRIPT
+
+    scores: Dict[str, float] = {}
+    for script in OCR_SCRIPTS:
+        reader = registry.get(f"easyocr:{script}")
+        scores[script] = script_score(
+            script, reader.recognize(grey, horizontal_list=sample, free_list=sample_free, reformat=False)
+        )
+        if script == PRIMARY_SCRIPT and scores[script] >= OCR_SCRIPT_ACCEPT_SCORE:
+            break
+    return max(scores, key=scores.get)
+
+
+def extract_text_easyocr(image: Union[Image.Image, np.ndarray], script: Optional[str] = None) -> List[Tuple[str, float]]:
+    """
+    OCR with the reader for the image's script: `script` (or OCR_SCRIPT when it isn't "auto") forces one,
+    otherwise it is detected from a sample of the text boxes. Boxes are detected once and shared by all readers.
+    """
+    from easyocr.utils import reformat_input
+
+    script = script or (OCR_SCRIPT if OCR_SCRIPT != "auto" else None)
+    if script is not None and script not in OCR_SCRIPTS:
+        raise ValueError(f"Unknown OCR script '{script}', expected one of {', '.join(OCR_SCRIPTS)}")
+
+    # np.asarray reads the PIL buffer once instead of np.array's extra full-image copy
+    image_np = image if isinstance(image, np.ndarray) else np.asarray(image)
+    with span("ocr"):
+        image_np, grey = reformat_input(image_np)
+        horizontal_list, free_list = registry.get(f"easyocr:{PRIMARY_SCRIPT}").detect(image_np, reformat=False)
+        horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+        if script is None:
+            with span("ocr_script_detection"):
+                script = detect_script(grey, horizontal_list, free_list)
+        with _routed_lock:
+            _routed[script] += 1
+
+        results = registry.get(f"easyocr:{script}").recognize(
+            grey, horizontal_list=horizontal_list, free_list=free_list, reformat=False
+        )
     return [(text, confidence) for _, text, confidence in results]
+
+
+def ocr_script_stats() -> Dict[str, int]:
+    """Images routed to each script's reader by this process."""
+    with _routed_lock:
+        return dict(_routed)
@@ -0,0 +1,92 @@
+from pathlib import Path
+from typing import Tuple
+
+IMAGE_FORMATS = {"jpeg", "png", "bmp", "tiff", "gif", "webp"}
+AUDIO_FORMATS = {"mp3", "wav", "ogg", "flac", "m4a", "webm"}
+
+_EXTENSION_FORMATS = {
+    ".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".bmp": "bmp", ".tiff": "tiff", ".tif": "tiff",
+    ".gif": "gif", ".webp": "webp",
+    ".mp3": "mp3", ".wav": "wav", ".ogg": "ogg", ".flac": "flac", ".m4a": "m4a", ".webm": "webm",
+}
+
+# ISO base media (the MP4 family) brands from the ftyp box. Only the M4A brands are audio by themselves; HEIF/AVIF
+# are the still-image formats phones save photos in, which Pillow can't open
+_ISO_AUDIO_BRANDS = {b"M4A ", b"M4B ", b"M4P ", b"F4A ", b"F4B "}
+_ISO_IMAGE_BRANDS = {
+    b"heic": "heic", b"heix": "heic", b"heim": "heic", b"heis": "heic", b"hevc": "heic", b"hevx": "heic",
+    b"mif1": "heic", b"msf1": "heic", b"avif": "avif", b"avis": "avif",
+}
+
+IMAGE_MIME_TYPES = {
+    "jpeg": "image/jpeg", "png": "image/png", "bmp": "image/bmp", "tiff": "image/tiff",
+    "gif": "image/gif", "webp": "image/webp",
+}
+
+
+def sniff_format(data: bytes) -> str:
+    """Identifies the container format from its leading magic bytes; returns "" when unrecognised."""
+    head = data[:16]
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if head.startswith((b"II*\x00", b"MM\x00*")):
+        return "tiff"
+    if head.startswith(b"BM"):
+        return "bmp"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "webp"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if head[4:8] == b"ftyp":
+        return _sniff_iso_media(data)
+    # ID3 tag, or a bare MPEG audio frame (11 sync bits set)
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return ""
+
+
+def _sniff_iso_media(data: bytes) -> str:
+    """
+    Tells M4A audio from the rest of the ISO base media family: HEIF/AVIF photos by their brands, and generic
+    brands (mp42, isom, ...) by their track handlers, which count as audio only with a sound track and no video.
+    """
+    ftyp_size = int.from_bytes(data[:4], "big")
+    major = data[8:12]
+    brands = {major} | {data[i:i + 4] for i in range(16, min(ftyp_size, 256), 4)}
+    if major in _ISO_AUDIO_BRANDS:
+        return "m4a"
+    for brand in (major, *sorted(brands)):
+        if brand in _ISO_IMAGE_BRANDS:
+            return _ISO_IMAGE_BRANDS[brand]
+
+    handlers = set()
+    i = data.find(b"hdlr")
+    while i != -1:
+        handlers.add(data[i + 12:i + 16])  # handler_type, after the version/flags and pre_defined fields
+        i = data.find(b"hdlr", i + 4)
+    if b"soun" in handlers and b"vide" not in handlers:
+        return "m4a"
+    return "mp4"
+
+
+def detect_file_type(data: bytes, filename: str = "") -> Tuple[str, str]:
+    """
+    Returns (file_type, format) where file_type is "image", "audio" or "unknown". The content decides;
+    the filename extension is only consulted when the magic bytes are not recognised.
+    """
+    fmt = sniff_format(data) or _EXTENSION_FORMATS.get(Path(filename).suffix.lower(), "")
+    if fmt in IMAGE_FORMATS:
+        return "image", fmt
+    if fmt in AUDIO_FORMATS:
+        return "audio", fmt
+    return "unknown", fmt
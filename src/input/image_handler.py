@@ -1,7 +1,12 @@
 from PIL import Image
+import io
 import os
 
 def load_image(image_path: str) -> Image.Image:
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image not found at path: {image_path}")
     return Image.open(image_path)
+
+def load_image_from_bytes(data: bytes) -> Image.Image:
+    """Decodes an image straight from an upload buffer, without touching disk."""
+    return Image.open(io.BytesIO(data))
@@ -0,0 +1,88 @@
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from configs.config import (
+    PREPROCESS_FIX_ORIENTATION,
+    PREPROCESS_MAX_LONG_EDGE,
+    PREPROCESS_GRAYSCALE,
+    PREPROCESS_AUTOCONTRAST,
+    PREPROCESS_CROP_RECEIPT
+)
+
+
+def downscale(image: Image.Image, max_long_edge: int) -> Image.Image:
+    """Shrinks the image so its longer side is at most max_long_edge pixels, keeping the aspect ratio."""
+    long_edge = max(image.size)
+    if not max_long_edge or long_edge <= max_long_edge:
+        return image
+    scale = max_long_edge / long_edge
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weights = np.cumsum(histogram)
+    means = np.cumsum(histogram * np.arange(256))
+    total_weight, total_mean = weights[-1], means[-1]
+    background = weights[:-1]
+    foreground = total_weight - background
+    valid = (background > 0) & (foreground > 0)
+    between = np.zeros(255)
+    between[valid] = (
+        (total_mean * background[valid] - total_weight * means[:-1][valid]) ** 2
+        / (background[valid] * foreground[valid])
+    )
+    return int(np.argmax(between))
+
+
+def find_receipt_region(image: Image.Image, margin: float = 0.02) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Returns the bounding box of the bright paper area, or None when it covers (nearly) the whole image or too
+    little of it to be a receipt. Works on a small thumbnail, so it is cheap compared to OCR.
+    """
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((256, 256))
+    gray = np.asarray(thumbnail)
+    mask = Image.fromarray(((gray > _otsu_threshold(gray)) * 255).astype(np.uint8))
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+
+    scale_x, scale_y = image.width / thumbnail.width, image.height / thumbnail.height
+    left, top, right, bottom = bbox
+    pad_x, pad_y = margin * image.width, margin * image.height
+    region = (
+        max(0, int(left * scale_x - pad_x)), max(0, int(top * scale_y - pad_y)),
+        min(image.width, int(right * scale_x + pad_x)), min(image.height, int(bottom * scale_y + pad_y))
+    )
+    coverage = (region[2] - region[0]) * (region[3] - region[1]) / (image.width * image.height)
+    if coverage > 0.9 or coverage < 0.1:
+        return None
+    return region
+
+
+def preprocess_image(
+        image: Image.Image,
+        fix_orientation: bool = PREPROCESS_FIX_ORIENTATION,
+        max_long_edge: int = PREPROCESS_MAX_LONG_EDGE,
+        grayscale: bool = PREPROCESS_GRAYSCALE,
+        autocontrast: bool = PREPROCESS_AUTOCONTRAST,
+        crop_receipt: bool = PREPROCESS_CROP_RECEIPT
+) -> Image.Image:
+    """Prepares a photo for OCR. Every step can be switched off; the defaults come from configs.config."""
+    if fix_orientation:
+        image = ImageOps.exif_transpose(image)
+    if crop_receipt:
+        region = find_receipt_region(image)
+        if region:
+            image = image.crop(region)
+    if max_long_edge:
+        image = downscale(image, max_long_edge)
+    if grayscale:
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if autocontrast:
+        image = ImageOps.autocontrast(image, cutoff=1)
+    return image
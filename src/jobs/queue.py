@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional
+
+from configs.config import (
+    JOB_QUEUE_PATH,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_STATS_WINDOW_SECONDS
+)
+
+
+class Job(NamedTuple):
+    id: str
+    data: bytes
+    filename: str
+    e2e: bool
+    attempts: int
+
+
+class JobQueue:
+    """
+    Durable receipt job queue in a SQLite file shared by the API (submit/poll) and worker processes (claim/finish).
+    A claimed job is leased to its worker for JOB_LEASE_SECONDS and the worker renews the lease while it runs;
+    jobs whose lease runs out (the worker died) go back to the queue until they have been tried JOB_MAX_ATTEMPTS
+    times. The upload bytes are dropped once a job finishes, and finished jobs are purged after
+    JOB_RESULT_TTL_SECONDS.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self._lock = threading.Lock()
+        # Autocommit, so claims can take the write lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # pollers don't block the writer
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT NOT NULL, e2e INTEGER NOT NULL, data BLOB,"
+            " result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, lease_expires REAL,"
+            " created REAL NOT NULL, started REAL, finished REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished)")
+
+    def submit(self, data: bytes, filename: str, e2e: bool) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, filename, e2e, data, created) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, filename, int(e2e), data, time.time())
+            )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Leases the oldest queued job (or one whose worker's lease expired) to `worker`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Worker lost the job too many times.', finished = ?,"
+                    " data = NULL WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, JOB_MAX_ATTEMPTS)
+                )
+                row = self._conn.execute(
+                    "SELECT id, data, filename, e2e, attempts FROM jobs"
+                    " WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)"
+                    " ORDER BY created LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_expires = ?,"
+                        " started = ? WHERE id = ?",
+                        (worker, now + JOB_LEASE_SECONDS, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job_id, data, filename, e2e, attempts = row
+        return Job(job_id, data, filename, bool(e2e), attempts + 1)
+
+    def renew(self, job_id: str, worker: str) -> bool:
+        """Extends the lease; False if the job is no longer this worker's (it expired and was claimed again)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + JOB_LEASE_SECONDS, job_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, result) -> None:
+        self._finish(job_id, worker, "done", json.dumps(result, default=str), None)
+
+    def fail(self, job_id: str, worker: str, error: str) -> None:
+        self._finish(job_id, worker, "failed", None, error)
+
+    def _finish(self, job_id: str, worker: str, status: str, result: Optional[str], error: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, data = NULL"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, result, error, time.time(), job_id, worker)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """The job's status and timestamps, plus its result or error once it has finished."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, filename, result, error, attempts, created, started, finished FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            position = None
+            if row is not None and row[0] == "queued":
+                position = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?", (row[5],)
+                ).fetchone()[0]
+        if row is None:
+            return None
+        status, filename, result, error, attempts, created, started, finished = row
+        job = {"job_id": job_id, "status": status, "filename": filename, "attempts": attempts,
+               "created": created, "started": started, "finished": finished}
+        if position is not None:
+            job["queue_position"] = position
+        if status == "done":
+            job["result"] = json.loads(result)
+        elif status == "failed":
+            job["error"] = error
+        return job
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def purge(self) -> int:
+        """Deletes jobs that finished more than JOB_RESULT_TTL_SECONDS ago."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (time.time() - JOB_RESULT_TTL_SECONDS,)
+            )
+        return cursor.rowcount
+
+    def stats(self, window: float = JOB_STATS_WINDOW_SECONDS) -> Dict:
+        """
+        Queue depth and jobs per status, how long queued jobs wait before a worker picks them up, and per-worker
+        throughput over the last `window` seconds.
+        """
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(created) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            waits: List[float] = sorted(w for (w,) in self._conn.execute(
+                "SELECT started - created FROM jobs WHERE started >= ?", (now - window,)
+            ))
+            workers = self._conn.execute(
+                "SELECT worker, COUNT(*), SUM(status = 'failed'), AVG(finished - started) FROM jobs"
+                " WHERE finished >= ? AND worker IS NOT NULL GROUP BY worker",
+                (now - window,)
+            ).fetchall()
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "wait_seconds_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_seconds_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+            "workers": {
+                worker: {
+                    "finished": finished,
+                    "failed": failed,
+                    "jobs_per_minute": round(finished * 60 / window, 2),
+                    "seconds_per_job": round(seconds or 0.0, 3),
+                }
+                for worker, finished, failed, seconds in workers
+            },
+        }
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
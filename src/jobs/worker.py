@@ -0,0 +1,108 @@
+# jobs/worker.py
+# Drains the receipt job queue that POST /jobs fills. Run one or more next to the API, sharing JOB_QUEUE_PATH:
+#   python -m jobs.worker [--concurrency 2]
+import asyncio
+import logging
+import os
+import signal
+import socket
+from argparse import ArgumentParser
+
+from dotenv import load_dotenv
+
+from jobs.queue import Job, JobQueue, get_job_queue
+from pipeline.receipt import process_file_cached, read_upload
+from configs.config import JOB_WORKER_CONCURRENCY, JOB_POLL_INTERVAL_SECONDS, JOB_LEASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 600
+
+
+async def run_job(queue: JobQueue, job: Job, worker: str, api_key: str):
+    """Processes one job through the same pipeline as /process, renewing its lease until it finishes."""
+    async def keep_leased():
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not await asyncio.to_thread(queue.renew, job.id, worker):
+                logger.warning(f"Lost the lease on job {job.id}")
+                return
+
+    renewing = asyncio.create_task(keep_leased())
+    try:
+        upload = await asyncio.to_thread(read_upload, job.data, job.filename)
+        if upload.file_type not in ("image", "audio"):
+            await asyncio.to_thread(queue.fail, job.id, worker, "Unsupported file type.")
+            return
+        # Jobs queue for stage slots here rather than failing fast: the job queue is the backpressure
+        receipts, saved = await process_file_cached(upload, job.e2e, api_key, wait=True)
+        await asyncio.to_thread(queue.complete, job.id, worker, {"receipts": receipts, "cached": saved is not None})
+        logger.info(f"Job {job.id} done (attempt {job.attempts})")
+    except Exception as e:
+        logger.exception(f"Job {job.id} failed")
+        await asyncio.to_thread(queue.fail, job.id, worker, f"Processing error: {e}")
+    finally:
+        renewing.cancel()
+
+
+async def run_worker(concurrency: int, poll_interval: float, stop: asyncio.Event):
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise SystemExit("GEMINI_API_KEY not set.")
+
+    queue = get_job_queue()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    last_purge = float("-inf")
+    loop = asyncio.get_running_loop()
+    logger.info(f"Worker {worker} polling with concurrency {concurrency}")
+
+    while not stop.is_set():
+        await slots.acquire()
+        if stop.is_set():
+            slots.release()
+            break
+        job = await asyncio.to_thread(queue.claim, worker)
+        if job is None:
+            slots.release()
+            if loop.time() - last_purge > PURGE_INTERVAL_SECONDS:
+                last_purge = loop.time()
+                await asyncio.to_thread(queue.purge)
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(run_job(queue, job, worker, api_key))
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(lambda _: slots.release())
+
+    # Let claimed jobs finish; a hard kill instead leaves them to be retried once their lease expires
+    if running:
+        logger.info(f"Stopping after {len(running)} running job(s)")
+        await asyncio.gather(*running)
+
+
+def main():
+    parser = ArgumentParser(description="Process queued receipt jobs.")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=JOB_POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        await run_worker(args.concurrency, args.poll_interval, stop)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from pydantic import TypeAdapter
+
+from configs.config import (
+    GEMINI_MODEL,
+    GEMINI_BACKEND,
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_MAX_RETRIES,
+    GEMINI_BACKOFF_BASE_SECONDS,
+    GEMINI_BACKOFF_MAX_SECONDS,
+    GEMINI_STUB_RESPONSES_PATH,
+    GEMINI_STUB_LATENCY_MS
+)
+from models.registry import registry
+from observability.tracing import span
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def prompt_key(contents: Any) -> str:
+    """Stable short hash of a prompt (text and inline parts), used to look up stub/recorded responses."""
+    digest = hashlib.sha256()
+    for part in contents if isinstance(contents, list) else [contents]:
+        if isinstance(part, str):
+            digest.update(part.encode("utf-8"))
+        else:
+            inline = getattr(part, "inline_data", None)
+            digest.update(inline.data if inline is not None else repr(part).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _is_retryable(error: Exception) -> bool:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in RETRYABLE_STATUS_CODES:
+        return True
+    try:
+        import httpx
+        return isinstance(error, httpx.TransportError)
+    except ImportError:
+        return False
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Full jitter keeps clients that were throttled together from retrying together
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class StubResponse:
+    def __init__(self, text: str, parsed: Any = None):
+        self.text = text
+        self.parsed = parsed
+
+
+class StubBackend:
+    """
+    Offline stand-in for the Gemini API. Answers come from a JSON file mapping prompt_key() to response text;
+    unknown prompts get "[]" when a response schema is requested and "SELECT 1" otherwise.
+    """
+
+    def __init__(self, responses_path: str = GEMINI_STUB_RESPONSES_PATH, latency_ms: int = GEMINI_STUB_LATENCY_MS):
+        self.responses: Dict[str, str] = {}
+        if responses_path and os.path.exists(responses_path):
+            with open(responses_path, encoding="utf-8") as f:
+                self.responses = json.load(f)
+        self.latency = latency_ms / 1000
+
+    def respond(self, contents: Any, config: Optional[Dict]) -> StubResponse:
+        schema = (config or {}).get("response_schema")
+        text = self.responses.get(prompt_key(contents), "[]" if schema else "SELECT 1")
+        parsed = TypeAdapter(schema).validate_json(text) if schema else None
+        return StubResponse(text, parsed)
+
+    def generate_sync(self, model: str, contents: Any, config: Optional[Dict]) -> StubResponse:
+        time.sleep(self.latency)
+        return self.respond(contents, config)
+
+    async def generate(self, model: str, contents: Any, config: Optional[Dict]) -> StubResponse:
+        await asyncio.sleep(self.latency)
+        return self.respond(contents, config)
+
+
+class GenaiBackend:
+    """One genai.Client, so its HTTP connections are reused across calls."""
+
+    def __init__(self, api_key: str):
+        from google import genai
+        self.client = genai.Client(api_key=api_key)
+
+    def generate_sync(self, model: str, contents: Any, config: Optional[Dict]):
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    async def generate(self, model: str, contents: Any, config: Optional[Dict]):
+        return await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+
+class RecordingBackend:
+    """
+    Calls the real API and saves every response text under its prompt_key() in the responses file, so later
+    runs can replay them offline with the stub backend.
+    """
+
+    def __init__(self, api_key: str, responses_path: str = GEMINI_STUB_RESPONSES_PATH):
+        if not responses_path:
+            raise ValueError("GEMINI_STUB_RESPONSES_PATH must be set to record responses")
+        self.backend = GenaiBackend(api_key)
+        self.responses_path = responses_path
+        self.responses: Dict[str, str] = {}
+        if os.path.exists(responses_path):
+            with open(responses_path, encoding="utf-8") as f:
+                self.responses = json.load(f)
+        self._lock = threading.Lock()
+
+    def _record(self, contents: Any, response):
+        with self._lock:
+            self.responses[prompt_key(contents)] = response.text
+            temp_path = f"{self.responses_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.responses, f, indent=1, ensure_ascii=False)
+            os.replace(temp_path, self.responses_path)
+        return response
+
+    def generate_sync(self, model: str, contents: Any, config: Optional[Dict]):
+        return self._record(contents, self.backend.generate_sync(model, contents, config))
+
+    async def generate(self, model: str, contents: Any, config: Optional[Dict]):
+        return self._record(contents, await self.backend.generate(model, contents, config))
+
+
+BACKENDS = {"genai": GenaiBackend, "record": RecordingBackend}
+
+
+class GeminiClient:
+    """
+    Shared Gemini client for structuring and NL2SQL. Caps the number of calls in flight and retries rate-limit
+    and transient server errors with jittered exponential backoff. Async callers and sync callers (CLI, worker
+    threads) are limited separately.
+    """
+
+    def __init__(self, api_key: str, backend: str = GEMINI_BACKEND, max_concurrency: int = GEMINI_MAX_CONCURRENCY):
+        self.backend_name = backend
+        self.backend = StubBackend() if backend == "stub" else BACKENDS[backend](api_key)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._sync_semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    async def generate(self, contents: Any, config: Optional[Dict] = None, model: str = GEMINI_MODEL):
+        # One span per logical call, retries and backoff included
+        async with self._semaphore:
+            with span("gemini"):
+                for attempt in range(GEMINI_MAX_RETRIES + 1):
+                    self._count(calls=1, in_flight=1)
+                    try:
+                        return await self.backend.generate(model, contents, config)
+                    except Exception as e:
+                        if attempt == GEMINI_MAX_RETRIES or not _is_retryable(e):
+                            self._count(failures=1)
+                            raise
+                        self._count(retries=1)
+                        delay = _backoff_seconds(attempt)
+                        logger.warning(f"Gemini call failed ({e}); retrying in {delay:.2f}s")
+                    finally:
+                        self._count(in_flight=-1)
+                    await asyncio.sleep(delay)
+
+    def generate_sync(self, contents: Any, config: Optional[Dict] = None, model: str = GEMINI_MODEL):
+        with self._sync_semaphore, span("gemini"):
+            for attempt in range(GEMINI_MAX_RETRIES + 1):
+                self._count(calls=1, in_flight=1)
+                try:
+                    return self.backend.generate_sync(model, contents, config)
+                except Exception as e:
+                    if attempt == GEMINI_MAX_RETRIES or not _is_retryable(e):
+                        self._count(failures=1)
+                        raise
+                    self._count(retries=1)
+                    delay = _backoff_seconds(attempt)
+                    logger.warning(f"Gemini call failed ({e}); retrying in {delay:.2f}s")
+                finally:
+                    self._count(in_flight=-1)
+                time.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.backend_name,
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "in_flight": self.in_flight,
+            }
+
+    def _count(self, calls: int = 0, retries: int = 0, failures: int = 0, in_flight: int = 0):
+        with self._lock:
+            self.calls += calls
+            self.retries += retries
+            self.failures += failures
+            self.in_flight += in_flight
+
+
+_clients: Dict[str, GeminiClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_gemini_client(api_key: Optional[str] = None) -> GeminiClient:
+    """Returns the shared client for an API key (GEMINI_API_KEY by default)."""
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = GeminiClient(api_key)
+        return _clients[api_key]
+
+
+def gemini_stats() -> list:
+    with _clients_lock:
+        clients = list(_clients.values())
+    return [client.stats() for client in clients]
+
+
+registry.register("genai", get_gemini_client, warmup=False)  # needs GEMINI_API_KEY; built on first use
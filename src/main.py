@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from argparse import ArgumentParser
 
 from input.image_handler import load_image
+from input.preprocess import preprocess_image
 from extraction.easyocr_extractor import extract_text_easyocr
 from speech.whisper_transcriber import transcribe_audio
 from structure.structure_llm import (
@@ -58,7 +59,7 @@ def main():
             except Exception as e:
                 print(f"Error while parsing image with Gemini: {e}")
         else:
-            image = load_image(input_path)
+            image = preprocess_image(load_image(input_path))
             ocr_results = extract_text_easyocr(image)
             text = "\n".join([t for t, _ in ocr_results])
             print("\n== Raw Extracted Text ==")
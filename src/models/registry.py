@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from observability.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (falls back to peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """
+    Holds a loader per model name and builds each model the first time it is requested (or on warmup),
+    recording how long the load took and how much resident memory it added. Models registered with
+    warmup=False (alternatives to the configured ones, or needing optional packages) only load when asked for
+    by name.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._warmup_by_default: Dict[str, bool] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict] = {}
+        # Loads are serialized so the memory delta of one model isn't mixed up with another's
+        self._load_lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any], warmup: bool = True):
+        self._loaders[name] = loader
+        self._warmup_by_default[name] = warmup
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+
+        with self._load_lock:
+            if name not in self._models:
+                rss_before = _rss_bytes()
+                start = time.perf_counter()
+                with span(f"model_load_{name}"):
+                    self._models[name] = self._loaders[name]()
+                load_time = time.perf_counter() - start
+                self._stats[name] = {
+                    "load_time_sec": round(load_time, 3),
+                    "memory_mb": round(max(_rss_bytes() - rss_before, 0) / 2 ** 20, 1),
+                    "loaded_at": time.time(),
+                }
+                logger.info(f"Loaded model '{name}' in {load_time:.2f}s")
+            return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warmup(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Loads the given models (by default those registered with warmup=True) and returns their stats."""
+        if names is None:
+            names = [name for name in self._loaders if self._warmup_by_default[name]]
+        for name in names:
+            self.get(name)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {"loaded": name in self._models, **self._stats.get(name, {})}
+            for name in self._loaders
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,67 @@
+import re
+from typing import Any, Callable, Dict, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Stage work runs from milliseconds (cache lookups, decode) to tens of seconds (long audio, Gemini retries)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "budgetly_stage_seconds", "Time spent in each pipeline stage span.", ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "budgetly_request_seconds", "HTTP request latency.", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(["budgetly", *parts])).lower()
+
+
+def _flatten(prefix: tuple, value: Any) -> Iterator:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(prefix + (str(key),), item)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _flatten(prefix + (str(index),), item)
+    elif isinstance(value, bool):
+        yield prefix, float(value)
+    elif isinstance(value, (int, float)):
+        yield prefix, float(value)
+
+
+class StatsCollector:
+    """
+    Exports the numeric fields of the /stats sources as gauges at scrape time, e.g. stage_stats()["ocr"]["queued"]
+    becomes budgetly_stages_ocr_queued. In-flight counts, queue depths, cache hit rates and model load times
+    therefore stay in one place: the stats() methods that already track them.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Any]]):
+        self.sources = sources
+
+    def describe(self):
+        # Keeps registration from calling collect(), which would create every cache and pool up front
+        return []
+
+    def collect(self):
+        for source, read in self.sources.items():
+            try:
+                values = read()
+            except Exception:
+                continue
+            for path, number in _flatten((source,), values):
+                gauge = GaugeMetricFamily(_metric_name(*path), f"{'.'.join(path)} from /stats")
+                gauge.add_metric([], number)
+                yield gauge
+
+
+def register_stats_collector(sources: Dict[str, Callable[[], Any]]):
+    REGISTRY.register(StatsCollector(sources))
+
+
+def render_metrics() -> tuple:
+    """(body, content type) for a /metrics response."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
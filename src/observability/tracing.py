@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from observability.metrics import REQUEST_SECONDS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """Spans recorded while handling one request. Spans can be added from worker threads that copied the context."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []  # (name, seconds), in completion order
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.spans.append((name, seconds))
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """name -> (total seconds, count), in first-seen order."""
+        totals: Dict[str, Tuple[float, int]] = {}
+        with self._lock:
+            for name, seconds in self.spans:
+                total, count = totals.get(name, (0.0, 0))
+                totals[name] = (total + seconds, count + 1)
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. `decode;dur=12.1, ocr;dur=840.3, gemini;dur=1203.9;desc="2 calls"`."""
+        parts = []
+        for name, (seconds, count) in self.totals().items():
+            part = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                part += f';desc="{count} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Times the block into the stage latency histogram and, inside a request, into its trace. Spans in executor
+    threads reach the trace only if the work was submitted with the caller's context (StagePool.call does this
+    for thread executors).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, seconds)
+        logger.debug(f"span {name} {seconds * 1000:.1f}ms")
+
+
+def add_timing_middleware(app):
+    """
+    Starts a trace for every request, adds its spans as a Server-Timing header, observes the request latency
+    histogram and logs one timing line per request. Streaming responses only carry the spans that finished
+    before their headers were sent.
+    """
+    @app.middleware("http")
+    async def timing(request, call_next):
+        trace = start_trace()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers["Server-Timing"] = trace.server_timing()
+            return response
+        finally:
+            route = request.scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            seconds = time.perf_counter() - trace.start
+            REQUEST_SECONDS.labels(method=request.method, route=path, status=str(status)).observe(seconds)
+            spans = " ".join(f"{name}={total * 1000:.0f}ms" for name, (total, _) in trace.totals().items())
+            logger.info(f"{request.method} {path} {status} {seconds * 1000:.0f}ms {spans}".rstrip())
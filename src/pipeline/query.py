@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Tuple
+
+from chat.chat import extract_sql, natural_language_to_sql_async, stream_query_rows, summarize_streamed_results
+from chat.synthesis import ResultSummary
+from pipeline.stages import stages
+
+# Chunks buffered between the database thread and the response; the cursor waits when the client falls behind
+STREAM_BUFFER_CHUNKS = 2
+
+
+async def stream_query(question: str, raw_only: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Yields ("sql", {...}) once the question is translated, ("rows", [...]) for every chunk the cursor returns,
+    then ("summary", {...}) with the row count and, unless raw_only is set, the answer. Rows are never collected:
+    only the running summary and a couple of in-flight chunks are kept.
+    """
+    sql, dialect = await stages["llm"].run_async(natural_language_to_sql_async, question, wait=True)
+    sql = extract_sql(sql)
+    if not sql:
+        raise ValueError("Unable to generate valid SQL from the question.")
+    yield "sql", {"sql": sql}
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+    cancelled = threading.Event()
+    done = object()
+
+    def fetch():
+        # Runs on its own thread; put() blocks it while the queue is full, which bounds memory
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        try:
+            rows = stream_query_rows(sql, dialect=dialect)
+            try:
+                for chunk in rows:
+                    if cancelled.is_set():
+                        break
+                    put(chunk)
+            finally:
+                rows.close()
+            put(done)
+        except Exception as e:
+            put(e)
+
+    summary = None
+    try:
+        async with stages["db"].slot(wait=True):
+            fetching = loop.run_in_executor(None, fetch)
+            while (item := await queue.get()) is not done:
+                if isinstance(item, Exception):
+                    raise item
+                if summary is None:
+                    summary = ResultSummary(list(item[0].keys()))
+                summary.add(item)
+                yield "rows", item
+            await fetching
+    finally:
+        cancelled.set()
+        # Unblock a producer stuck on a full queue so it sees the cancellation and releases its connection
+        while not queue.empty():
+            queue.get_nowait()
+
+    summary = summary or ResultSummary([])
+    answer = None if raw_only else await stages["llm"].run_async(
+        summarize_streamed_results, question, sql, summary, dialect, wait=True
+    )
+    yield "summary", {"row_count": summary.row_count, "natural_language_response": answer}
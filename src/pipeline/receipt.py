@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from tempfile import NamedTemporaryFile
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from input.file_type import IMAGE_MIME_TYPES, detect_file_type, sniff_format
+from input.image_handler import load_image_from_bytes
+from input.preprocess import preprocess_image
+from extraction.easyocr_extractor import extract_text_easyocr
+from speech.whisper_transcriber import transcribe_audio, transcribe_audio_stream
+from structure.structure_llm import (
+    Receipt,
+    parse_receipt_with_gemini_async,
+    parse_receipt_image_bytes_with_gemini_async
+)
+from pipeline.stages import reserve, stages
+from observability.tracing import span
+from cache.sqlite_store import SQLiteTTLCache
+from configs.config import (
+    RESULT_CACHE_PATH,
+    RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_MAX_ENTRIES,
+    AUDIO_SPOOL_FORMATS
+)
+
+# Formats Gemini accepts inline; anything else is re-encoded as PNG for the e2e path
+GEMINI_IMAGE_FORMATS = {"jpeg", "png", "webp"}
+
+_result_cache: Optional[SQLiteTTLCache] = None
+
+
+def get_result_cache() -> SQLiteTTLCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = SQLiteTTLCache(
+            RESULT_CACHE_PATH, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_MAX_ENTRIES, table="receipt_results"
+        )
+    return _result_cache
+
+
+class Upload(NamedTuple):
+    data: bytes
+    file_type: str  # "image", "audio" or "unknown"
+    fmt: str        # container format, e.g. "jpeg" or "mp3"
+    digest: str     # sha256 of data
+
+
+def read_upload(data: bytes, filename: str = "") -> Upload:
+    """Types the upload from its magic bytes and hashes it for the result cache."""
+    file_type, fmt = detect_file_type(data, filename)
+    return Upload(data, file_type, fmt, hashlib.sha256(data).hexdigest())
+
+
+def result_cache_key(upload: Upload, e2e: bool) -> str:
+    mode = "e2e" if upload.file_type == "image" and e2e else ("ocr" if upload.file_type == "image" else "asr")
+    return f"{mode}:{upload.digest}"
+
+
+@contextmanager
+def audio_input(upload: Upload) -> Iterator[Union[str, BinaryIO]]:
+    """
+    Yields something faster-whisper can decode: an in-memory buffer, or a temp file for formats listed in
+    AUDIO_SPOOL_FORMATS and uploads whose format was only guessed from the filename.
+    """
+    if upload.fmt not in AUDIO_SPOOL_FORMATS and sniff_format(upload.data):
+        yield io.BytesIO(upload.data)
+        return
+
+    with NamedTemporaryFile(delete=False, suffix=f".{upload.fmt or 'bin'}") as temp:
+        temp.write(upload.data)
+    try:
+        yield temp.name
+    finally:
+        os.remove(temp.name)
+
+
+def ocr_image_bytes(data: bytes) -> str:
+    """Decodes and preprocesses an image and returns its OCR text, one detected line per row."""
+    with span("decode"):
+        image = preprocess_image(load_image_from_bytes(data))
+    ocr_results = extract_text_easyocr(image)
+    return "\n".join([t for t, _ in ocr_results])
+
+
+async def parse_image_upload_with_gemini(upload: Upload, api_key: str) -> List[Receipt]:
+    data, fmt = upload.data, upload.fmt
+    if fmt not in GEMINI_IMAGE_FORMATS:
+        data, fmt = await asyncio.to_thread(_to_png, data), "png"
+    return await parse_receipt_image_bytes_with_gemini_async(data, IMAGE_MIME_TYPES[fmt], api_key)
+
+
+def _to_png(data: bytes) -> bytes:
+    buffer = io.BytesIO()
+    load_image_from_bytes(data).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def extract_text(upload: Upload, wait: bool = False) -> str:
+    """Runs OCR or transcription for the upload on the matching stage pool."""
+    if upload.file_type == "image":
+        return await stages["ocr"].run(ocr_image_bytes, upload.data, wait=wait)
+    elif upload.file_type == "audio":
+        with audio_input(upload) as source:
+            return await stages["asr"].run(transcribe_audio, source, wait=wait)
+    raise ValueError(f"Unsupported file type: {upload.file_type}")
+
+
+async def process_file(upload: Upload, e2e: bool, api_key: str, wait: bool = False) -> List[Receipt]:
+    """Turns an image or audio receipt into structured receipts without blocking the event loop."""
+    if upload.file_type == "image" and e2e:
+        return await stages["llm"].run_async(parse_image_upload_with_gemini, upload, api_key, wait=wait)
+
+    text = await extract_text(upload, wait=wait)
+    return await stages["llm"].run_async(parse_receipt_with_gemini_async, text, api_key, wait=wait)
+
+
+async def process_file_cached(upload: Upload, e2e: bool, api_key: str,
+                              wait: bool = False) -> Tuple[List[Dict], Optional[float]]:
+    """
+    Like process_file, but returns receipts as dicts and serves repeat uploads of the same content and mode from
+    the result cache. The second value is the latency a cache hit saved, or None on a miss.
+    """
+    cache = get_result_cache()
+    key = result_cache_key(upload, e2e)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    receipts = [r.model_dump() for r in await process_file(upload, e2e, api_key, wait=wait)]
+    # An empty result is usually a transient OCR/Gemini miss; don't serve it for the whole TTL
+    if receipts:
+        await asyncio.to_thread(cache.set, key, receipts, time.perf_counter() - start)
+    return receipts, None
+
+
+def _stages_for(file_type: str, e2e: bool) -> List[str]:
+    if file_type == "image":
+        return ["llm"] if e2e else ["ocr", "llm"]
+    return ["asr", "llm"]
+
+
+async def process_batch(uploads: List[Upload], e2e: bool, api_key: str) -> List[Dict]:
+    """
+    Processes uploads concurrently. Every file moves through OCR/ASR and structuring on its own, so later files
+    are still being read while earlier ones are already with Gemini; the stage pools bound how many of each run
+    at once. Returns one {"receipts": ...} or {"error": ...} entry per upload, in order.
+    """
+    # The whole batch is admitted up front: it reserves a place per file on every stage it needs, or is rejected
+    # with StageBusyError, and its files then queue on those places instead of on the stages
+    needed = Counter(stage for upload in uploads if upload.file_type in ("image", "audio")
+                     for stage in _stages_for(upload.file_type, e2e))
+
+    async def run_one(upload: Upload) -> Dict:
+        if upload.file_type not in ("image", "audio"):
+            return {"error": "Unsupported file type."}
+        try:
+            receipts, saved = await process_file_cached(upload, e2e, api_key, wait=True)
+            return {"receipts": receipts, "cached": saved is not None}
+        except Exception as e:
+            return {"error": f"Processing error: {e}"}
+
+    with reserve(needed):
+        return await asyncio.gather(*(run_one(upload) for upload in uploads))
+
+
+async def stream_audio_receipt(upload: Upload, api_key: str) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Yields ("segment", {...}) events while the audio is transcribed, then ("transcript", {...}) and
+    ("receipts", [...]) once structuring is done. Cached uploads go straight to the receipts event.
+    """
+    cache = get_result_cache()
+    key = result_cache_key(upload, False)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        yield "receipts", cached[0]
+        return
+
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+    done = object()
+
+    def decode():
+        # Runs on its own thread (the segment generator can't cross into a process pool) and hands
+        # every decoded segment back to the event loop
+        try:
+            with audio_input(upload) as source:
+                for segment in transcribe_audio_stream(source):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, segment)
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    texts = []
+    try:
+        async with stages["asr"].slot(wait=True):
+            decoding = loop.run_in_executor(None, decode)
+            while (item := await queue.get()) is not done:
+                if isinstance(item, Exception):
+                    raise item
+                texts.append(item["text"])
+                yield "segment", item
+            await decoding
+    finally:
+        cancelled.set()
+
+    text = " ".join(texts).strip()
+    yield "transcript", {"text": text}
+
+    receipts = await stages["llm"].run_async(parse_receipt_with_gemini_async, text, api_key, wait=True)
+    receipts = [r.model_dump() for r in receipts]
+    if receipts:
+        await asyncio.to_thread(cache.set, key, receipts, time.perf_counter() - start)
+    yield "receipts", receipts
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict
+
+from configs.config import (
+    STAGE_EXECUTOR,
+    OCR_CONCURRENCY, OCR_QUEUE_SIZE,
+    ASR_CONCURRENCY, ASR_QUEUE_SIZE,
+    LLM_CONCURRENCY, LLM_QUEUE_SIZE,
+    DB_CONCURRENCY, DB_QUEUE_SIZE
+)
+from observability.tracing import span
+
+
+class StageBusyError(Exception):
+    """Raised when a stage already has as many jobs running and queued as it is allowed to hold."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"The {stage} stage is at capacity, please retry later.")
+        self.stage = stage
+
+
+# Places the current batch holds per stage (see reserve()); the batch's file tasks inherit it from process_batch
+_reservations: contextvars.ContextVar[Dict[str, asyncio.Semaphore]] = contextvars.ContextVar(
+    "stage_reservations", default={}
+)
+
+
+class StagePool:
+    """
+    Runs blocking work for one pipeline stage on its own executor. At most `max_concurrency` jobs run at once
+    and at most `max_queue` wait for a slot; further submissions fail fast with StageBusyError. Places reserved
+    by a batch count against the same bound until the batch is done.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.pending = 0
+        self.reserved = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self, wait: bool = False):
+        """
+        Holds one of the stage's concurrency slots. With wait=True the queue limit is not enforced. Inside a
+        batch that reserved places on this stage, the caller waits for one of those instead.
+        """
+        reservation = _reservations.get().get(self.name)
+        if reservation is not None:
+            await reservation.acquire()
+            self.reserved -= 1
+        elif not wait and self.saturated:
+            self.rejected += 1
+            raise StageBusyError(self.name)
+
+        self.pending += 1
+        try:
+            with span(f"{self.name}_queue"):
+                await self._semaphore.acquire()
+            self.in_flight += 1
+            try:
+                yield self
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+        finally:
+            self.pending -= 1
+            if reservation is not None:
+                self.reserved += 1
+                reservation.release()
+
+    @property
+    def capacity(self) -> int:
+        return self.max_concurrency + self.max_queue
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending + self.reserved >= self.capacity
+
+    @contextmanager
+    def reserve(self, count: int):
+        """
+        Sets aside `count` places (at most the stage's whole capacity) for one batch, or fails fast if they are
+        not free. Yields a semaphore over the reserved places; a batch larger than the stage queues its overflow
+        on it rather than on the stage.
+        """
+        count = min(count, self.capacity)
+        if self.pending + self.reserved + count > self.capacity:
+            self.rejected += 1
+            raise StageBusyError(self.name)
+        self.reserved += count
+        try:
+            yield asyncio.Semaphore(count)
+        finally:
+            self.reserved -= count
+
+    async def run(self, fn: Callable, *args, wait: bool = False, **kwargs) -> Any:
+        async with self.slot(wait=wait):
+            return await self.call(fn, *args, **kwargs)
+
+    async def run_async(self, coro_fn: Callable, *args, wait: bool = False, **kwargs) -> Any:
+        """Awaits an async call while holding a slot, for stages whose work is already non-blocking."""
+        async with self.slot(wait=wait):
+            return await coro_fn(*args, **kwargs)
+
+    async def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Runs fn on the stage executor; the caller is expected to hold a slot."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        if isinstance(self.executor, ThreadPoolExecutor):
+            # Carry the request's trace into the worker thread so spans recorded there show up in it
+            call = functools.partial(contextvars.copy_context().run, call)
+        return await loop.run_in_executor(self.executor, call)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.pending - self.in_flight,
+            "reserved": self.reserved,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+def _cpu_executor(name: str, workers: int) -> Executor:
+    # Process workers each load their own copy of the models through the registry
+    if STAGE_EXECUTOR == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+
+stages: Dict[str, StagePool] = {
+    "ocr": StagePool("ocr", _cpu_executor("ocr", OCR_CONCURRENCY), OCR_CONCURRENCY, OCR_QUEUE_SIZE),
+    "asr": StagePool("asr", _cpu_executor("asr", ASR_CONCURRENCY), ASR_CONCURRENCY, ASR_QUEUE_SIZE),
+    "llm": StagePool("llm", ThreadPoolExecutor(LLM_CONCURRENCY, thread_name_prefix="llm"), LLM_CONCURRENCY, LLM_QUEUE_SIZE),
+    "db": StagePool("db", ThreadPoolExecutor(DB_CONCURRENCY, thread_name_prefix="db"), DB_CONCURRENCY, DB_QUEUE_SIZE),
+}
+
+
+@contextmanager
+def reserve(counts: Dict[str, int]):
+    """
+    Reserves places on several stages at once for a batch, all or nothing. slot() calls made within the block
+    (and in tasks started from it) draw on those places instead of being admitted one by one.
+    """
+    with ExitStack() as stack:
+        held = {name: stack.enter_context(stages[name].reserve(count)) for name, count in counts.items() if count}
+        token = _reservations.set({**_reservations.get(), **held})
+        try:
+            yield
+        finally:
+            _reservations.reset(token)
+
+
+def stage_stats() -> Dict[str, Dict]:
+    return {name: pool.stats() for name, pool in stages.items()}
@@ -0,0 +1,64 @@
+# speech/bulk.py
+# Backfills transcripts for a directory of recordings with the batched Whisper pipeline, appending one JSON line per
+# file to the output. Files already transcribed in the output are skipped, so an interrupted run picks up where it
+# stopped and files that failed are retried:
+#   python -m speech.bulk /archive/voice-notes --output transcripts.jsonl [--batch-size 16] [--num-workers 2]
+import json
+import os
+import time
+from argparse import ArgumentParser
+
+from input.file_type import AUDIO_FORMATS
+from models.registry import registry
+from speech.whisper_transcriber import load_model, transcribe_bulk
+from configs.config import WHISPER_BATCH_SIZE, WHISPER_NUM_WORKERS
+
+
+def audio_files(root: str):
+    for dirpath, _, filenames in sorted(os.walk(root)):
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower().lstrip(".") in AUDIO_FORMATS:
+                yield os.path.join(dirpath, filename)
+
+
+def done_paths(output: str):
+    """Paths with a transcript in the output; lines recording an error don't count, so those files run again."""
+    if not os.path.exists(output):
+        return set()
+    with open(output, encoding="utf-8") as f:
+        entries = (json.loads(line) for line in f if line.strip())
+        return {entry["path"] for entry in entries if "error" not in entry}
+
+
+def main():
+    parser = ArgumentParser(description="Transcribe a directory of audio files in bulk.")
+    parser.add_argument("directory")
+    parser.add_argument("--output", default="transcripts.jsonl")
+    parser.add_argument("--batch-size", type=int, default=WHISPER_BATCH_SIZE)
+    parser.add_argument("--num-workers", type=int, default=WHISPER_NUM_WORKERS,
+                        help="Files transcribed in parallel; the model is loaded with as many workers.")
+    parser.add_argument("--chunk", type=int, default=32, help="Files per checkpoint to the output file.")
+    args = parser.parse_args()
+
+    # The batched pipeline wraps the registry's "whisper" model, so build that with the requested workers
+    registry.register("whisper", lambda: load_model(num_workers=args.num_workers))
+
+    done = done_paths(args.output)
+    pending = [path for path in audio_files(args.directory) if path not in done]
+    print(f"{len(pending)} files to transcribe ({len(done)} already done)")
+
+    audio_seconds, start = 0.0, time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out:
+        for offset in range(0, len(pending), args.chunk):
+            paths = pending[offset:offset + args.chunk]
+            for path, result in zip(paths, transcribe_bulk(paths, args.batch_size, args.num_workers)):
+                out.write(json.dumps({"path": path, **result}, ensure_ascii=False) + "\n")
+                audio_seconds += result.get("duration", 0.0)
+            out.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{offset + len(paths)}/{len(pending)} files, {audio_seconds / 60:.1f} min of audio, "
+                  f"RTF {elapsed / audio_seconds if audio_seconds else 0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
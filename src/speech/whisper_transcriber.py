@@ -1,11 +1,98 @@
-from faster_whisper import WhisperModel
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Union
+import numpy as np
+from configs.config import (
+    WHISPER_VAD_FILTER,
+    WHISPER_VAD_MIN_SILENCE_MS,
+    WHISPER_MODEL_SIZE,
+    WHISPER_DEVICE,
+    WHISPER_COMPUTE_TYPE,
+    WHISPER_CPU_THREADS,
+    WHISPER_NUM_WORKERS,
+    WHISPER_BATCH_SIZE
+)
+from models.registry import registry
+from observability.tracing import span
 
-model = WhisperModel("base", device="cpu", compute_type="int8")  # Use "cuda" if GPU available
+SAMPLING_RATE = 16000  # what Whisper's feature extractor expects
 
-def transcribe_audio(audio_path: str) -> str:
-    segments, _ = model.transcribe(audio_path)
+AudioSource = Union[str, BinaryIO, np.ndarray]
 
-    transcript = ""
+
+def load_model(size: str = WHISPER_MODEL_SIZE, cpu_threads: int = WHISPER_CPU_THREADS,
+               num_workers: int = WHISPER_NUM_WORKERS):
+    from faster_whisper import WhisperModel
+    return WhisperModel(size, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE_TYPE,
+                        cpu_threads=cpu_threads, num_workers=num_workers)
+
+
+def _load_batched_pipeline():
+    from faster_whisper import BatchedInferencePipeline
+    # Shares the weights of the streaming model rather than loading a second copy
+    return BatchedInferencePipeline(model=registry.get("whisper"))
+
+
+registry.register("whisper", load_model)
+registry.register("whisper-batched", _load_batched_pipeline, warmup=False)  # only used for bulk backfills
+
+
+def transcribe_audio_stream(audio: AudioSource, vad_filter: bool = WHISPER_VAD_FILTER) -> Iterator[Dict]:
+    """Yields {"start", "end", "text"} for each segment as soon as faster-whisper has decoded it."""
+    model = registry.get("whisper")
+    segments, _ = model.transcribe(
+        audio,
+        vad_filter=vad_filter,
+        vad_parameters={"min_silence_duration_ms": WHISPER_VAD_MIN_SILENCE_MS}
+    )
     for segment in segments:
-        transcript += segment.text + " "
-    return transcript.strip()
+        yield {"start": round(segment.start, 2), "end": round(segment.end, 2), "text": segment.text.strip()}
+
+
+def transcribe_audio(audio: AudioSource) -> str:
+    """Transcribes a file path or an in-memory audio buffer."""
+    with span("transcription"):
+        return " ".join(segment["text"] for segment in transcribe_audio_stream(audio)).strip()
+
+
+def decode(audio: Union[str, BinaryIO]) -> np.ndarray:
+    """Decodes and resamples to 16 kHz mono float32 once, so neither VAD nor the model decode the file again."""
+    from faster_whisper.audio import decode_audio
+    with span("audio_decode"):
+        return decode_audio(audio, sampling_rate=SAMPLING_RATE)
+
+
+def transcribe_batched(audio: AudioSource, batch_size: int = WHISPER_BATCH_SIZE, pipeline=None) -> Dict:
+    """
+    Transcribes one recording with faster-whisper's batched pipeline: VAD splits the speech into chunks of up to
+    30s and `batch_size` chunks go through the model per forward pass. Returns {"text", "duration", "language"}.
+    """
+    pipeline = pipeline or registry.get("whisper-batched")
+    samples = audio if isinstance(audio, np.ndarray) else decode(audio)
+    with span("transcription"):
+        segments, info = pipeline.transcribe(
+            samples,
+            batch_size=batch_size,
+            vad_filter=True,  # the batched pipeline chunks long audio by speech regions
+            vad_parameters={"min_silence_duration_ms": WHISPER_VAD_MIN_SILENCE_MS}
+        )
+        text = " ".join(segment.text.strip() for segment in segments).strip()
+    return {"text": text, "duration": round(len(samples) / SAMPLING_RATE, 2), "language": info.language}
+
+
+def transcribe_bulk(sources: List[AudioSource], batch_size: int = WHISPER_BATCH_SIZE,
+                    num_workers: int = WHISPER_NUM_WORKERS) -> List[Dict]:
+    """
+    Transcribes many recordings, `num_workers` at a time (the model serves that many in parallel, see
+    WHISPER_NUM_WORKERS), each decoded once just before its turn so memory stays bounded by the files in
+    flight. Returns one transcribe_batched() result, or {"error": ...}, per source, in order.
+    """
+    pipeline = registry.get("whisper-batched")
+
+    def run(source: AudioSource) -> Dict:
+        try:
+            return transcribe_batched(source, batch_size, pipeline)
+        except Exception as e:
+            return {"error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as pool:
+        return list(pool.map(run, sources))
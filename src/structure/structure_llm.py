@@ -1,6 +1,8 @@
-from google import genai
+from google.genai import types
 from pydantic import BaseModel
 from typing import List, Literal
+from input.file_type import IMAGE_MIME_TYPES, sniff_format
+from llm.gemini import get_gemini_client
 
 
 class ReceiptItem(BaseModel):
@@ -20,10 +22,14 @@ class Receipt(BaseModel):
     total: float
     items: List[ReceiptItem]
 
-def parse_receipt_with_gemini(text: str, api_key: str) -> List[Receipt]:
-    client = genai.Client(api_key=api_key)
+RECEIPT_CONFIG = {"response_mime_type": "application/json", "response_schema": list[Receipt], }
+
+IMAGE_PROMPT = """Extract the structured information from this receipt image.
+ Return the result as a JSON object with keys: vendor (string), date (string), total (float), and items (list of strings)."""
+
 
-    prompt = f"""Extract the structured information from this receipt OCR text:
+def _text_prompt(text: str) -> str:
+    return f"""Extract the structured information from this receipt OCR text:
     ---
     {text}
     ---
@@ -31,29 +37,30 @@ def parse_receipt_with_gemini(text: str, api_key: str) -> List[Receipt]:
     Keep the same language.
 """
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt,
-        config={"response_mime_type": "application/json", "response_schema": list[Receipt],}
-    )
 
-    return response.parsed
+def _image_contents(image_bytes: bytes, mime_type: str) -> list:
+    return [types.Part.from_bytes(data=image_bytes, mime_type=mime_type), IMAGE_PROMPT]
 
-def parse_receipt_image_with_gemini(image_path: str, api_key: str) -> List[Receipt]:
-    client = genai.Client(api_key=api_key)
 
-    # Upload the image
-    uploaded_file = client.files.upload(file=image_path)
+def parse_receipt_with_gemini(text: str, api_key: str) -> List[Receipt]:
+    response = get_gemini_client(api_key).generate_sync(_text_prompt(text), config=RECEIPT_CONFIG)
+    return response.parsed
+
+async def parse_receipt_with_gemini_async(text: str, api_key: str) -> List[Receipt]:
+    response = await get_gemini_client(api_key).generate(_text_prompt(text), config=RECEIPT_CONFIG)
+    return response.parsed
 
-    # Prompt for structured extraction
-    prompt = """Extract the structured information from this receipt image.
- Return the result as a JSON object with keys: vendor (string), date (string), total (float), and items (list of strings)."""
+def parse_receipt_image_with_gemini(image_path: str, api_key: str) -> List[Receipt]:
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    mime_type = IMAGE_MIME_TYPES.get(sniff_format(image_bytes), "image/jpeg")
+    return parse_receipt_image_bytes_with_gemini(image_bytes, mime_type, api_key)
 
-    # Send image + prompt to Gemini
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[uploaded_file, prompt],
-        config={"response_mime_type": "application/json", "response_schema": list[Receipt], }
-    )
+def parse_receipt_image_bytes_with_gemini(image_bytes: bytes, mime_type: str, api_key: str) -> List[Receipt]:
+    """Sends the image inline with the prompt instead of uploading a file first."""
+    response = get_gemini_client(api_key).generate_sync(_image_contents(image_bytes, mime_type), config=RECEIPT_CONFIG)
+    return response.parsed
 
-    return response.parsed
\ No newline at end of file
+async def parse_receipt_image_bytes_with_gemini_async(image_bytes: bytes, mime_type: str, api_key: str) -> List[Receipt]:
+    response = await get_gemini_client(api_key).generate(_image_contents(image_bytes, mime_type), config=RECEIPT_CONFIG)
+    return response.parsed